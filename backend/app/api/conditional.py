@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from email.utils import formatdate
+import zlib
+
+from fastapi import Request, Response
+
+from app.services.payloads import etag_matches
+
+
+def live_etag(variant: str, *parts: int | bytes | None) -> str:
+    """Weak validator from tick/model-version integers and small pre-encoded parts (hashed).
+
+    Weak, so one tag covers the identity and compressed forms of a body.
+    """
+    tokens = [str(part) if isinstance(part, int) else f"{zlib.crc32(part or b''):08x}" for part in parts]
+    return f'W/"{".".join([*tokens, variant])}"'
+
+
+async def conditional_response(
+    request: Request,
+    etag: str,
+    build: Callable[[], bytes],
+    last_modified: float | None = None,
+) -> Response:
+    """304 when `If-None-Match` matches `etag`, else the body, compressed once per tag when the client accepts it.
+
+    Building and compressing run in a worker thread, off the event loop.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    content, coding = await asyncio.to_thread(
+        request.app.state.compressed_bodies.encode, etag, build, request.headers.get("accept-encoding")
+    )
+    if coding is not None:
+        headers["Content-Encoding"] = coding
+    return Response(content=content, media_type="application/json", headers=headers)
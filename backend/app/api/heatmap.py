@@ -1,35 +1,136 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Query, Request
+import asyncio
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+try:
+    from websockets.exceptions import ConnectionClosed
+except ImportError:  # pragma: no cover - servers without the websockets library
+    ConnectionClosed = WebSocketDisconnect
+
+from app.api.conditional import conditional_response, live_etag
+from app.services.payloads import LIVE_DYNAMIC_ROWS_KEY, LIVE_ROWS_KEY, SIM_STATUS_KEY, EncodedRows, live_body
 
 
 router = APIRouter(prefix="/live", tags=["live"])
 
+# `fields=dynamic` drops the static columns; clients join them from /network/segments.
+ROWS_KEYS = {"all": LIVE_ROWS_KEY, "dynamic": LIVE_DYNAMIC_ROWS_KEY}
+
+# What sending to a client that has gone away raises: Starlette's disconnect, a send after close
+# (RuntimeError), socket errors, or the websockets library's own close error under uvicorn.
+CLIENT_GONE_ERRORS = (WebSocketDisconnect, RuntimeError, OSError, ConnectionClosed)
+
+# Idle SSE connections get a comment line this often, so proxies keep them open
+# and disconnected clients are noticed.
+SSE_KEEPALIVE_SECONDS = 15.0
+
 
 def get_state(request: Request):
     return request.app.state
 
 
+async def _live_response(
+    request: Request,
+    limit: int | None,
+    since_tick: int | None = None,
+    fields: Literal["all", "dynamic"] = "all",
+    epoch: int | None = None,
+) -> Response:
+    state = get_state(request)
+    blob, status = await state.state_cache.aget_many([ROWS_KEYS[fields], SIM_STATUS_KEY])
+    rows = EncodedRows(blob) if blob else None
+    if rows is None:
+        return Response(content=live_body(None, status), media_type="application/json")
+
+    scheduler = getattr(state, "scheduler", None)
+    change_log = scheduler.change_log if scheduler is not None else None
+    current_epoch = change_log.epoch if change_log is not None else None
+
+    def build() -> bytes:
+        if since_tick is None:
+            return live_body(rows, status, limit)
+        changed = change_log.changed_since(since_tick, rows.tick, epoch) if change_log is not None else None
+        meta = {"tick": rows.tick, "epoch": current_epoch, "since_tick": since_tick, "full": changed is None}
+        return live_body(rows, status, limit, indices=changed, meta=meta)
+
+    variant = f"{fields}.{limit or 'all'}"
+    if since_tick is not None:
+        variant += f".since{since_tick}" + ("" if epoch is None else f".epoch{epoch}")
+    # Status is hashed into the tag: controls can change it while a paused simulation keeps its tick.
+    etag = live_etag(variant, rows.tick, rows.model_version, current_epoch, status)
+    return await conditional_response(request, etag, build, last_modified=rows.published_at)
+
+
 @router.get("/segments")
-def get_live_segments(
+async def get_live_segments(
     request: Request,
     limit: int = Query(300, ge=1, le=5000),
+    fields: Literal["all", "dynamic"] = "all",
 ):
-    state = get_state(request)
-    rows = state.state_cache.get_json("live_segments", [])
-    return {
-        "count": len(rows),
-        "items": rows[:limit],
-        "status": state.state_cache.get_json("sim_status", {}),
-    }
+    return await _live_response(request, limit, fields=fields)
 
 
 @router.get("/heatmap")
-def get_live_heatmap(request: Request):
-    state = get_state(request)
-    rows = state.state_cache.get_json("live_heatmap", [])
-    return {
-        "count": len(rows),
-        "items": rows,
-        "status": state.state_cache.get_json("sim_status", {}),
-    }
+async def get_live_heatmap(
+    request: Request,
+    since_tick: int | None = Query(None, ge=0),
+    fields: Literal["all", "dynamic"] = "all",
+    epoch: int | None = None,
+):
+    """With `since_tick`, only rows that changed after that tick, or every row when the change log no longer reaches it.
+
+    Send the `epoch` of the response that `since_tick` came from: after a
+    simulation reset the epoch changes and the client gets every row.
+    """
+    return await _live_response(request, None, since_tick, fields, epoch)
+
+
+@router.websocket("/stream")
+async def live_stream_socket(websocket: WebSocket):
+    """A snapshot frame, then one delta frame per tick; slow clients are resynced with a fresh snapshot.
+
+    Frames are binary messages holding UTF-8 JSON: the shared bytes are sent
+    as is, without a per-client decode.
+    """
+    broadcaster = websocket.app.state.scheduler.broadcaster
+    await websocket.accept()
+    subscription = broadcaster.subscribe()
+    try:
+        while True:
+            _, frame = await subscription.queue.get()
+            await websocket.send_bytes(frame)
+    except CLIENT_GONE_ERRORS:
+        pass
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+async def _sse_frames(request: Request, broadcaster):
+    subscription = broadcaster.subscribe()
+    try:
+        while True:
+            try:
+                kind, frame = await asyncio.wait_for(subscription.queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield b": keep-alive\n\n"
+                continue
+            yield b"event: %s\ndata: %s\n\n" % (kind.encode(), frame)
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def live_stream_events(request: Request):
+    """Server-Sent Events variant of the WebSocket stream; the event name is `snapshot` or `delta`."""
+    broadcaster = get_state(request).scheduler.broadcaster
+    return StreamingResponse(
+        _sse_frames(request, broadcaster),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
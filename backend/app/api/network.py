@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Request, Response
+
+from app.services.payloads import etag_matches
+
+
+router = APIRouter(prefix="/network", tags=["network"])
+
+
+@router.get("/segments")
+def get_network_segments(request: Request):
+    """Static segment attributes and geometry; revalidate with `If-None-Match` to get a 304 when unchanged."""
+    network = request.app.state.scheduler.static_network
+    headers = {"ETag": network.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), network.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=network.body, media_type="application/json", headers=headers)
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-from datetime import datetime
-
 from fastapi import APIRouter, HTTPException, Request
+import numpy as np
 
-from app.core.feature_engineering import build_feature_row
+from app.api.conditional import conditional_response, live_etag
+from app.services.payloads import MODEL_METRICS_KEY, decode_versioned
 
 
 router = APIRouter(prefix="/prediction", tags=["prediction"])
@@ -18,22 +18,16 @@ def prediction_for_segment(segment_id: int, request: Request):
     if segment_id not in simulation_engine.segment_by_id:
         raise HTTPException(status_code=404, detail="segment not found")
 
-    segment = simulation_engine.segment_by_id[segment_id]
-    state = simulation_engine.live_state[segment_id]
-    history = list(simulation_engine.congestion_history[segment_id])
-    features = build_feature_row(
-        segment_id=segment_id,
-        timestamp=datetime.fromisoformat(state["timestamp"]),
-        congestion_history=history,
-        capacity=segment.capacity,
-        vehicle_count=state["vehicle_count"],
-        incident_flag=state["incident_flag"],
+    predictions, lower, upper = prediction_engine.forecast(
+        simulation_engine.tick_count,
+        simulation_engine.feature_matrix,
     )
-    pred, low, high = prediction_engine.predict(features)
+    idx = simulation_engine.segment_index[segment_id]
+    pred, low, high = float(predictions[idx]), float(lower[idx]), float(upper[idx])
 
     return {
         "segment_id": segment_id,
-        "historical_congestion": prediction_engine.get_segment_history(segment_id),
+        "historical_congestion": np.round(simulation_engine.segment_history(segment_id, 120).astype(np.float64), 4).tolist(),
         "predicted_congestion": round(pred, 4),
         "confidence_lower": round(low, 4),
         "confidence_upper": round(high, 4),
@@ -43,5 +37,7 @@ def prediction_for_segment(segment_id: int, request: Request):
 
 
 @router.get("/metrics")
-def model_metrics(request: Request):
-    return request.app.state.state_cache.get_json("model_metrics", {})
+async def model_metrics(request: Request):
+    (blob,) = await request.app.state.state_cache.aget_many([MODEL_METRICS_KEY])
+    model_version, body = decode_versioned(blob) if blob else (0, b"{}")
+    return await conditional_response(request, live_etag("metrics", model_version, body), lambda: body)
@@ -3,8 +3,8 @@ from __future__ import annotations
 import time
 from typing import Literal
 
-from pydantic import BaseModel, Field
-from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field, model_validator
+from fastapi import APIRouter, HTTPException, Query, Request
 
 
 router = APIRouter(prefix="/route", tags=["routing"])
@@ -27,6 +27,14 @@ class Coordinate(BaseModel):
 class RouteAnalyzeRequest(BaseModel):
     origin: Coordinate
     destination: Coordinate
+    time_dependent: bool = False
+    alternatives: int = Field(0, ge=0, le=3)
+
+    @model_validator(mode="after")
+    def _alternatives_need_static_costs(self) -> RouteAnalyzeRequest:
+        if self.time_dependent and self.alternatives:
+            raise ValueError("alternatives are not available for time_dependent routes")
+        return self
 
 
 @router.post("/analyze")
@@ -34,12 +42,43 @@ def analyze_route(payload: RouteAnalyzeRequest, request: Request):
     result = request.app.state.routing_engine.analyze_route(
         origin=(payload.origin.lat, payload.origin.lon),
         destination=(payload.destination.lat, payload.destination.lon),
+        time_dependent=payload.time_dependent,
+        alternatives=payload.alternatives,
     )
     if not result["route_geometry"]:
         raise HTTPException(status_code=404, detail="No route found for the given coordinates")
     return result
 
 
+class RouteMatrixRequest(BaseModel):
+    origins: list[Coordinate] = Field(..., min_length=1, max_length=200)
+    destinations: list[Coordinate] = Field(..., min_length=1, max_length=200)
+
+
+@router.post("/matrix")
+def route_matrix(payload: RouteMatrixRequest, request: Request):
+    return request.app.state.routing_engine.travel_time_matrix(
+        origins=[(point.lat, point.lon) for point in payload.origins],
+        destinations=[(point.lat, point.lon) for point in payload.destinations],
+    )
+
+
+@router.get("/isochrone")
+def route_isochrone(
+    request: Request,
+    lat: float = Query(..., ge=6.2, le=6.8),
+    lon: float = Query(..., ge=3.0, le=3.7),
+    minutes: float = Query(..., gt=0, le=120),
+    mode: Literal["current", "predicted"] = "current",
+):
+    return request.app.state.routing_engine.isochrone(origin=(lat, lon), minutes=minutes, mode=mode)
+
+
+@router.get("/cache/stats")
+def route_cache_stats(request: Request):
+    return request.app.state.routing_engine.route_cache.stats()
+
+
 class ScenarioRequest(BaseModel):
     multiplier: float = Field(..., ge=0.2, le=2.5)
 
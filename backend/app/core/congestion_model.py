@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import numpy as np
+
 
 def compute_speed_and_congestion(
     vehicle_count: int,
@@ -17,3 +19,21 @@ def compute_speed_and_congestion(
     congestion_index = 1 - (avg_speed / safe_free_flow)
     congestion_index = min(max(congestion_index, 0.0), 1.0)
     return avg_speed, congestion_index
+
+
+def compute_speed_and_congestion_batch(
+    vehicle_count: np.ndarray,
+    capacity: np.ndarray,
+    free_flow_speed: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized `compute_speed_and_congestion` over aligned segment arrays."""
+    safe_capacity = np.maximum(capacity, 1)
+    safe_free_flow = np.maximum(free_flow_speed, 1.0)
+
+    load_factor = np.maximum(vehicle_count, 0) / safe_capacity
+    avg_speed = safe_free_flow * (1 - load_factor**2)
+    avg_speed = np.maximum(avg_speed, 1.0)
+
+    congestion_index = 1 - (avg_speed / safe_free_flow)
+    congestion_index = np.clip(congestion_index, 0.0, 1.0)
+    return avg_speed, congestion_index
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core.path_search import PathResult
+from app.core.road_graph import RoadGraph
+
+
+_INF = float("inf")
+_LEAF_SIZE = 16
+
+
+@dataclass(frozen=True, slots=True)
+class CCHMetric:
+    """Arc weights of a `ContractionHierarchy` customized for one segment weight vector.
+
+    `down[a]` holds the two arcs `(v, low)` and `(v, high)` a shortcut's
+    shortest path runs through via the lower node `v`, or -1s when the arc's
+    best path is the original segment `segment[a]`.
+    """
+
+    weights: np.ndarray
+    down: np.ndarray
+    segment: np.ndarray
+
+
+def _edge_ids(indptr: np.ndarray, nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """CSR edge positions of every outgoing edge of `nodes`, with the owning node."""
+    counts = indptr[nodes + 1] - indptr[nodes]
+    owners = np.repeat(nodes, counts)
+    starts = np.repeat(indptr[nodes] - np.cumsum(counts) + counts, counts)
+    return starts + np.arange(counts.sum()), owners
+
+
+def nested_dissection_order(graph: RoadGraph, node_xy: np.ndarray) -> np.ndarray:
+    """Contraction order from recursive geometric bisection, separators last.
+
+    Each cell is split at the median of its wider coordinate axis; the nodes
+    on the left with a neighbour on the right form the separator and are
+    ranked above both halves, which keeps the fill-in of road networks small.
+    """
+    side = np.zeros(graph.num_nodes, dtype=np.int8)
+    order: list[np.ndarray] = []
+    # Explicit stack of (nodes, separator-to-emit-after) frames in reverse emit order.
+    stack: list[tuple[np.ndarray | None, np.ndarray | None]] = [(np.arange(graph.num_nodes), None)]
+    while stack:
+        nodes, separator = stack.pop()
+        if nodes is None:
+            order.append(separator)
+            continue
+        if len(nodes) <= _LEAF_SIZE:
+            order.append(nodes)
+            continue
+
+        xy = node_xy[nodes]
+        axis = int(np.argmax(xy.max(axis=0) - xy.min(axis=0)))
+        by_axis = nodes[np.argsort(xy[:, axis], kind="stable")]
+        left, right = by_axis[: len(nodes) // 2], by_axis[len(nodes) // 2 :]
+
+        side[right] = 1
+        edges, owners = _edge_ids(graph.indptr, left)
+        crossing = np.unique(owners[side[graph.neighbors[edges]] == 1])
+        side[right] = 0
+
+        side[crossing] = 1
+        left = left[side[left] == 0]
+        side[crossing] = 0
+        stack.append((None, crossing))
+        stack.append((right, None))
+        stack.append((left, None))
+    return np.concatenate(order) if order else np.zeros(0, dtype=np.int64)
+
+
+class ContractionHierarchy:
+    """Customizable contraction hierarchy over a two-way `RoadGraph`.
+
+    Preprocessing depends on topology only: nodes are contracted in nested
+    dissection order and every fill-in arc is kept, so the upward graph is
+    chordal and the same shortcuts serve any weight vector. `customize` then
+    computes arc weights for one metric level by level with NumPy, and
+    `query` scans the elimination-tree ancestors of source and target
+    without a priority queue.
+    """
+
+    def __init__(self, graph: RoadGraph, node_xy: np.ndarray) -> None:
+        num_nodes = graph.num_nodes
+        order = nested_dissection_order(graph, node_xy)
+        rank = np.empty(num_nodes, dtype=np.int64)
+        rank[order] = np.arange(num_nodes)
+        self.rank = rank
+
+        # Symbolic contraction: merging a node's upper neighbours into its
+        # lowest one (its elimination-tree parent) yields the full clique fill.
+        upper: list[set[int]] = [set() for _ in range(num_nodes)]
+        for start, end in graph.segment_nodes.tolist():
+            if start != end:
+                low, high = (start, end) if rank[start] < rank[end] else (end, start)
+                upper[low].add(high)
+        rank_list = rank.tolist()
+        up_lists: list[list[int]] = [[] for _ in range(num_nodes)]
+        parent = [-1] * num_nodes
+        for node in order.tolist():
+            ups = sorted(upper[node], key=rank_list.__getitem__)
+            up_lists[node] = ups
+            if ups:
+                parent[node] = ups[0]
+                upper[ups[0]].update(ups[1:])
+            upper[node] = set()
+        self.parent = parent
+        # Upward arcs only reach elimination-tree ancestors, and a node's
+        # ancestors sit at distinct depths, so query labels along one ancestor
+        # chain are indexed by depth rather than by node.
+        depth = [0] * num_nodes
+        for node in reversed(order.tolist()):
+            if parent[node] >= 0:
+                depth[node] = depth[parent[node]] + 1
+        self._depth = depth
+        self._height = max(depth, default=0) + 1
+
+        counts = np.fromiter((len(ups) for ups in up_lists), dtype=np.int64, count=num_nodes)
+        self.up_indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.up_indptr[1:])
+        self.arc_low = np.repeat(np.arange(num_nodes, dtype=np.int64), counts)
+        self.arc_high = np.fromiter((u for ups in up_lists for u in ups), dtype=np.int64, count=int(counts.sum()))
+        self._arc_keys = self.arc_low * num_nodes + self.arc_high
+        self._arc_by_key = np.argsort(self._arc_keys, kind="stable")
+        self._sorted_keys = self._arc_keys[self._arc_by_key]
+        self._arc_depth = np.asarray(depth, dtype=np.int64)[self.arc_high]
+
+        # Original segments land on the arc joining their end nodes.
+        start, end = graph.segment_nodes[:, 0].astype(np.int64), graph.segment_nodes[:, 1].astype(np.int64)
+        self._segment_ids = np.flatnonzero(start != end)
+        start, end = start[self._segment_ids], end[self._segment_ids]
+        flip = rank[start] > rank[end]
+        self._segment_arc = self.arc_index(np.where(flip, end, start), np.where(flip, start, end))
+
+        # Lower triangles (v, u, w) with u below w in v's upper neighbourhood;
+        # customization relaxes arc(u, w) with arc(v, u) + arc(v, w). A node's
+        # level exceeds every lower neighbour's, so each level only writes
+        # arcs whose own triangles run in a later level.
+        level = [0] * num_nodes
+        for node in order.tolist():
+            for high in up_lists[node]:
+                if level[high] <= level[node]:
+                    level[high] = level[node] + 1
+        # Triangles are generated one level at a time so only the int32
+        # arrays that customization keeps are ever materialized in full.
+        by_level: dict[int, list[int]] = {}
+        for node in range(num_nodes):
+            if counts[node] >= 2:
+                by_level.setdefault(level[node], []).append(node)
+        self._triangles: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        for node_level in sorted(by_level):
+            firsts, seconds = [], []
+            for node in by_level[node_level]:
+                i, j = np.triu_indices(int(counts[node]), k=1)
+                base = self.up_indptr[node]
+                firsts.append(base + i)
+                seconds.append(base + j)
+            first, second = np.concatenate(firsts), np.concatenate(seconds)
+            target = self.arc_index(self.arc_high[first], self.arc_high[second])
+            self._triangles.append((first.astype(np.int32), second.astype(np.int32), target.astype(np.int32)))
+        self._up_indptr_list = self.up_indptr.tolist()
+        self._rank_list = rank_list
+
+    @property
+    def num_arcs(self) -> int:
+        return len(self.arc_high)
+
+    @property
+    def num_triangles(self) -> int:
+        return sum(len(first) for first, _, _ in self._triangles)
+
+    def arc_index(self, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        keys = np.asarray(low, dtype=np.int64) * len(self.rank) + np.asarray(high, dtype=np.int64)
+        return self._arc_by_key[np.searchsorted(self._sorted_keys, keys)]
+
+    def customize(self, segment_weights: np.ndarray) -> CCHMetric:
+        """Arc weights for `segment_weights` (indexed like the graph's segments)."""
+        weights = np.full(self.num_arcs, np.inf)
+        segment_cost = np.asarray(segment_weights, dtype=np.float64)[self._segment_ids]
+        np.minimum.at(weights, self._segment_arc, segment_cost)
+        segment = np.full(self.num_arcs, -1, dtype=np.int64)
+        cheapest = segment_cost == weights[self._segment_arc]
+        segment[self._segment_arc[cheapest]] = self._segment_ids[cheapest]
+
+        down = np.full((self.num_arcs, 2), -1, dtype=np.int32)
+        for first, second, target in self._triangles:
+            candidate = weights[first] + weights[second]
+            before = weights[target]
+            np.minimum.at(weights, target, candidate)
+            improved = np.flatnonzero((candidate < before) & (candidate == weights[target]))
+            down[target[improved], 0] = first[improved]
+            down[target[improved], 1] = second[improved]
+        return CCHMetric(weights=weights, down=down, segment=segment)
+
+    def _unpack(self, metric: CCHMetric, arc: int, upward: bool, out: list[int]) -> None:
+        """Append the segments of `arc`, traversed low-to-high when `upward`."""
+        stack = [(arc, upward)]
+        while stack:
+            arc, upward = stack.pop()
+            to_low, to_high = metric.down[arc].tolist()
+            if to_low < 0:
+                out.append(int(metric.segment[arc]))
+            elif upward:
+                # low -> v -> high; popped in reverse push order.
+                stack.append((to_high, True))
+                stack.append((to_low, False))
+            else:
+                stack.append((to_low, True))
+                stack.append((to_high, False))
+
+    def query(self, metric: CCHMetric, source: int, target: int) -> PathResult:
+        """Shortest path as segment indices, its cost and the number of nodes scanned.
+
+        Both elimination-tree ancestor chains are walked together in rank
+        order. Common ancestors are the only meeting candidates, and a node
+        whose distance is no better than the best meeting cost is not relaxed.
+        Labels live in two depth-indexed arrays the size of the tree height,
+        so a query allocates nothing proportional to the network; upper
+        separator nodes fan out to hundreds of arcs, so each node's arcs are
+        relaxed as one vectorized slice. Paths are recovered afterwards from
+        the labels instead of tracking predecessors during the search.
+        """
+        if source == target:
+            return [], 0.0, 0
+        indptr, arc_depth, weights, parent, rank, depth = (
+            self._up_indptr_list,
+            self._arc_depth,
+            metric.weights,
+            self.parent,
+            self._rank_list,
+            self._depth,
+        )
+        forward, backward = np.full(self._height, np.inf), np.full(self._height, np.inf)
+        forward[depth[source]] = 0.0
+        backward[depth[target]] = 0.0
+        best, meeting, scanned = _INF, -1, 0
+        up, down = source, target
+
+        while up >= 0 or down >= 0:
+            node = up if up >= 0 and (down < 0 or rank[up] <= rank[down]) else down
+            sides = []
+            if node == up:
+                sides.append(forward)
+                up = parent[up]
+            if node == down:
+                sides.append(backward)
+                down = parent[down]
+            scanned += 1
+
+            level = depth[node]
+            if len(sides) == 2:
+                total = float(forward[level] + backward[level])
+                if total < best:
+                    best, meeting = total, node
+            first, last = indptr[node], indptr[node + 1]
+            if first == last:
+                continue
+            heads = arc_depth[first:last]
+            for dist in sides:
+                cost = dist[level]
+                if cost < best:
+                    dist[heads] = np.minimum(dist[heads], cost + weights[first:last])
+
+        if meeting < 0:
+            return [], _INF, scanned
+
+        path: list[int] = []
+        for arc in reversed(self._chain_arcs(metric, forward, source, meeting)):
+            self._unpack(metric, arc, True, path)
+        for arc in self._chain_arcs(metric, backward, target, meeting):
+            self._unpack(metric, arc, False, path)
+        return path, best, scanned
+
+    def _chain_arcs(self, metric: CCHMetric, labels: np.ndarray, start: int, top: int) -> list[int]:
+        """Arcs of the labelled path from `top` down `start`'s ancestor chain, top first.
+
+        At each step the lower end is whichever chain node below has an arc
+        to the current node matching its label exactly: the label was
+        computed as that same sum.
+        """
+        chain = [start]
+        while chain[-1] != top:
+            chain.append(self.parent[chain[-1]])
+        chain_nodes = np.asarray(chain, dtype=np.int64)
+        chain_labels = labels[self._depth[start] - np.arange(len(chain))]
+        num_nodes, sorted_keys = len(self.rank), self._sorted_keys
+
+        arcs, position = [], len(chain) - 1
+        while position > 0:
+            below = chain_nodes[:position]
+            keys = below * num_nodes + chain_nodes[position]
+            found = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+            exists = sorted_keys[found] == keys
+            candidate = self._arc_by_key[found]
+            match = np.flatnonzero(exists & (chain_labels[:position] + metric.weights[candidate] == chain_labels[position]))
+            lower = int(match[-1])
+            arcs.append(int(candidate[lower]))
+            position = lower
+        return arcs
@@ -3,6 +3,29 @@ from __future__ import annotations
 from collections.abc import Sequence
 from datetime import datetime
 import statistics
+import threading
+
+import numpy as np
+
+from app.core.history_buffer import HistoryBuffer
+
+
+FEATURE_COLUMNS = [
+    "hour",
+    "day_of_week",
+    "lag_1",
+    "lag_3",
+    "lag_6",
+    "rolling_mean_15",
+    "rolling_mean_60",
+    "rolling_std_15",
+    "capacity_ratio",
+    "incident_flag",
+    "rush_hour",
+]
+FEATURE_INDEX = {name: idx for idx, name in enumerate(FEATURE_COLUMNS)}
+ROLLING_WINDOWS = (15, 60)
+RUSH_HOURS = {7, 8, 9, 17, 18, 19}
 
 
 def _safe_value(values: Sequence[float], idx_from_end: int) -> float:
@@ -20,13 +43,13 @@ def build_feature_row(
     incident_flag: int,
 ) -> dict:
     """Create feature row for a segment at a point in time."""
-    history = [float(x) for x in congestion_history if x is not None]
+    history = [float(x) for x in congestion_history[-max(ROLLING_WINDOWS) :] if x is not None]
 
     window_15 = history[-15:] if history else [0.0]
     window_60 = history[-60:] if history else [0.0]
 
     hour = timestamp.hour
-    rush_hour = 1 if hour in {7, 8, 9, 17, 18, 19} else 0
+    rush_hour = 1 if hour in RUSH_HOURS else 0
     capacity_ratio = vehicle_count / max(capacity, 1)
 
     return {
@@ -44,3 +67,100 @@ def build_feature_row(
         "incident_flag": incident_flag,
         "rush_hour": rush_hour,
     }
+
+
+class BatchFeatureEngine:
+    """Whole-network feature matrices maintained incrementally from a `HistoryBuffer`.
+
+    Each rolling window keeps a per-segment sliding Welford state (mean and
+    sum of squared deviations), so a tick costs O(segments) regardless of the
+    window lengths. The state is rebuilt from the buffer when the history is
+    cleared or skips ahead, and every `resync_interval` samples to shed
+    floating-point drift.
+    """
+
+    def __init__(self, history: HistoryBuffer, resync_interval: int = 3600) -> None:
+        self.history = history
+        self._lock = threading.Lock()
+        self.resync_interval = max(1, int(resync_interval))
+        # Sliding updates need the sample leaving the window, i.e. lag(window + 1).
+        self.incremental = history.window > max(ROLLING_WINDOWS)
+        self._synced = 0
+        self._count = dict.fromkeys(ROLLING_WINDOWS, 0)
+        self._mean = {w: np.zeros(history.num_rows) for w in ROLLING_WINDOWS}
+        self._m2 = {w: np.zeros(history.num_rows) for w in ROLLING_WINDOWS}
+
+    def sync(self) -> None:
+        # The scheduler and API request threads can both ask for a matrix.
+        with self._lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        total = self.history.total_appended
+        if total == self._synced:
+            return
+        if self.incremental and total == self._synced + 1 and total % self.resync_interval != 0:
+            self._push()
+        else:
+            self._resync()
+        self._synced = total
+
+    def _push(self) -> None:
+        value = self.history.lag(1).astype(np.float64)
+        for window in ROLLING_WINDOWS:
+            mean = self._mean[window]
+            m2 = self._m2[window]
+            count = self._count[window]
+            if count < window:
+                count += 1
+                delta = value - mean
+                mean += delta / count
+                m2 += delta * (value - mean)
+                self._count[window] = count
+            else:
+                dropped = self.history.lag(window + 1).astype(np.float64)
+                new_mean = mean + (value - dropped) / window
+                m2 += (value - dropped) * (value - new_mean + dropped - mean)
+                mean[:] = new_mean
+            np.maximum(m2, 0.0, out=m2)
+
+    def _resync(self) -> None:
+        for window in ROLLING_WINDOWS:
+            samples = self.history.tail(window).astype(np.float64)
+            count = samples.shape[1]
+            self._count[window] = count
+            if count == 0:
+                self._mean[window].fill(0.0)
+                self._m2[window].fill(0.0)
+                continue
+            mean = samples.mean(axis=1)
+            self._mean[window][:] = mean
+            self._m2[window][:] = ((samples - mean[:, None]) ** 2).sum(axis=1)
+
+    def matrix(
+        self,
+        timestamp: datetime,
+        vehicle_count: np.ndarray,
+        capacity: np.ndarray,
+        incident_flag: np.ndarray,
+    ) -> np.ndarray:
+        """`(segments, len(FEATURE_COLUMNS))` float64 matrix, rows aligned with the history."""
+        self.sync()
+        matrix = np.empty((self.history.num_rows, len(FEATURE_COLUMNS)), dtype=np.float64)
+        hour = timestamp.hour
+
+        matrix[:, FEATURE_INDEX["hour"]] = hour
+        matrix[:, FEATURE_INDEX["day_of_week"]] = timestamp.weekday()
+        matrix[:, FEATURE_INDEX["lag_1"]] = self.history.lag(1)
+        matrix[:, FEATURE_INDEX["lag_3"]] = self.history.lag(3)
+        matrix[:, FEATURE_INDEX["lag_6"]] = self.history.lag(6)
+        matrix[:, FEATURE_INDEX["rolling_mean_15"]] = self._mean[15]
+        matrix[:, FEATURE_INDEX["rolling_mean_60"]] = self._mean[60]
+        if self._count[15] > 1:
+            matrix[:, FEATURE_INDEX["rolling_std_15"]] = np.sqrt(self._m2[15] / self._count[15])
+        else:
+            matrix[:, FEATURE_INDEX["rolling_std_15"]] = 0.0
+        matrix[:, FEATURE_INDEX["capacity_ratio"]] = vehicle_count / np.maximum(capacity, 1)
+        matrix[:, FEATURE_INDEX["incident_flag"]] = incident_flag
+        matrix[:, FEATURE_INDEX["rush_hour"]] = 1 if hour in RUSH_HOURS else 0
+        return matrix
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class HistoryBuffer:
+    """Preallocated `rows x window` sample history with O(1) lags and zero-copy tail views.
+
+    Samples are written column by column into a `(rows, window + slack)` array.
+    When the write cursor reaches the end, the newest `window - 1` columns are
+    moved back to the front, so the latest `window` samples always form one
+    contiguous slice and `tail()` never has to stitch two halves together.
+    Views returned by `tail()`, `lag()` and `row()` are only valid until the
+    next `append()`.
+    """
+
+    def __init__(
+        self,
+        num_rows: int,
+        window: int = 3600,
+        slack: int | None = None,
+        dtype: type[np.floating] = np.float32,
+    ) -> None:
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = int(window)
+        self.slack = int(slack) if slack is not None else max(64, self.window // 8)
+        self._data = np.zeros((num_rows, self.window + self.slack), dtype=dtype)
+        self._end = 0
+        self._length = 0
+        self.total_appended = 0
+
+    @property
+    def num_rows(self) -> int:
+        return self._data.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, values: np.ndarray) -> None:
+        """Append one sample per row (one simulation tick)."""
+        if self._end == self._data.shape[1]:
+            keep = self.window - 1
+            if keep:
+                self._data[:, :keep] = self._data[:, self._end - keep : self._end]
+            self._end = keep
+        self._data[:, self._end] = values
+        self._end += 1
+        self._length = min(self._length + 1, self.window)
+        self.total_appended += 1
+
+    def tail(self, n: int | None = None) -> np.ndarray:
+        """`(rows, n)` view of the latest `n` samples, oldest first."""
+        n = self._length if n is None else max(0, min(int(n), self._length))
+        return self._data[:, self._end - n : self._end]
+
+    def lag(self, k: int) -> np.ndarray:
+        """Sample `k` steps back for every row (`k=1` is the latest).
+
+        Like `_safe_value` in feature engineering, a lag deeper than the stored
+        history falls back to the latest sample, and an empty buffer yields zeros.
+        """
+        if self._length == 0:
+            return np.zeros(self.num_rows, dtype=self._data.dtype)
+        if k < 1 or k > self._length:
+            k = 1
+        return self._data[:, self._end - k]
+
+    def row(self, idx: int, n: int | None = None) -> np.ndarray:
+        """1-D view of the latest `n` samples of a single row, oldest first."""
+        return self.tail(n)[idx]
+
+    def clear(self) -> None:
+        self._end = 0
+        self._length = 0
+        self.total_appended = 0
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class OnlineRLSRegressor:
+    """Linear regression updated by recursive least squares with exponential forgetting.
+
+    Each `partial_fit` call folds a block of rows (one simulation tick) into
+    the decayed normal equations and re-solves a `(features + 1)` square
+    system, so the cost per tick is fixed by the block size and feature count
+    and never grows with the amount of history seen.
+    """
+
+    def __init__(self, num_features: int, forgetting: float = 0.995, ridge: float = 1e-3) -> None:
+        size = num_features + 1
+        self.forgetting = forgetting
+        self.ridge = ridge
+        self._xtx = np.zeros((size, size))
+        self._xty = np.zeros(size)
+        self._ridge_eye = np.eye(size) * ridge
+        self._ridge_eye[-1, -1] = 0.0
+        # (coef, intercept), replaced in one assignment so concurrent predicts never mix two solves.
+        self._params: tuple[np.ndarray, float] = (np.zeros(num_features), 0.0)
+        self.n_seen = 0
+        self.prequential_mse: float | None = None
+
+    def partial_fit(self, x: np.ndarray, y: np.ndarray) -> OnlineRLSRegressor:
+        if len(y) == 0:
+            return self
+        if self.n_seen:
+            # Score the block before learning from it (prequential evaluation).
+            mse = float(np.mean((self.predict(x) - y) ** 2))
+            if self.prequential_mse is None:
+                self.prequential_mse = mse
+            else:
+                self.prequential_mse = self.forgetting * self.prequential_mse + (1 - self.forgetting) * mse
+
+        augmented = np.empty((len(y), x.shape[1] + 1))
+        augmented[:, :-1] = x
+        augmented[:, -1] = 1.0
+        self._xtx *= self.forgetting
+        self._xty *= self.forgetting
+        self._xtx += augmented.T @ augmented
+        self._xty += augmented.T @ y
+
+        solution = np.linalg.solve(self._xtx + self._ridge_eye, self._xty)
+        self._params = (solution[:-1], float(solution[-1]))
+        self.n_seen += len(y)
+        return self
+
+    @property
+    def coef_(self) -> np.ndarray:
+        return self._params[0]
+
+    @property
+    def intercept_(self) -> float:
+        return self._params[1]
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        coef, intercept = self._params
+        return x @ coef + intercept
+
+    @property
+    def prequential_rmse(self) -> float | None:
+        return None if self.prequential_mse is None else float(np.sqrt(self.prequential_mse))
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import bisect
+from collections.abc import Sequence
+import heapq
+import math
+
+import numpy as np
+
+from app.core.road_graph import RoadGraph
+
+
+# (segment indices on the path, path cost, nodes settled by the search)
+PathResult = tuple[list[int], float, int]
+
+_INF = float("inf")
+
+
+def _unwind(parent: dict[int, tuple[int, int]], source: int, target: int) -> list[int]:
+    segment_path = []
+    cur = target
+    while cur != source:
+        prev, segment_idx = parent[cur]
+        segment_path.append(segment_idx)
+        cur = prev
+    segment_path.reverse()
+    return segment_path
+
+
+def _csr_views(graph: RoadGraph) -> tuple[memoryview, memoryview, memoryview]:
+    # Memoryviews index as fast as lists without copying the CSR arrays.
+    return memoryview(graph.indptr), memoryview(graph.neighbors), memoryview(graph.edge_segment)
+
+
+def dijkstra(graph: RoadGraph, weights: Sequence[float], source: int, target: int) -> PathResult:
+    """Point-to-point Dijkstra over the CSR graph."""
+    indptr, neighbors, edge_segment = _csr_views(graph)
+    heap: list[tuple[float, int]] = [(0.0, source)]
+    best = {source: 0.0}
+    parent: dict[int, tuple[int, int]] = {}
+    settled = 0
+
+    while heap:
+        cost, node = heapq.heappop(heap)
+        if cost > best.get(node, _INF):
+            continue
+        settled += 1
+        if node == target:
+            break
+
+        for edge in range(indptr[node], indptr[node + 1]):
+            nxt = neighbors[edge]
+            segment_idx = edge_segment[edge]
+            nxt_cost = cost + weights[segment_idx]
+            if nxt_cost < best.get(nxt, _INF):
+                best[nxt] = nxt_cost
+                parent[nxt] = (node, segment_idx)
+                heapq.heappush(heap, (nxt_cost, nxt))
+
+    if target not in parent and source != target:
+        return [], _INF, settled
+    return _unwind(parent, source, target), best.get(target, 0.0), settled
+
+
+def astar(
+    graph: RoadGraph,
+    weights: Sequence[float],
+    source: int,
+    target: int,
+    node_xy: np.ndarray,
+    cost_per_km: float,
+) -> PathResult:
+    """A* with a straight-line lower bound `distance_km(node, target) * cost_per_km`.
+
+    `node_xy` holds projected node coordinates in kilometres. The bound is
+    consistent as long as no edge costs less than `cost_per_km` times the
+    straight-line distance between its end nodes.
+    """
+    indptr, neighbors, edge_segment = _csr_views(graph)
+    xs = memoryview(np.ascontiguousarray(node_xy[:, 0]))
+    ys = memoryview(np.ascontiguousarray(node_xy[:, 1]))
+    tx, ty = xs[target], ys[target]
+    hypot = math.hypot
+
+    heap: list[tuple[float, int]] = [(hypot(xs[source] - tx, ys[source] - ty) * cost_per_km, source)]
+    best = {source: 0.0}
+    parent: dict[int, tuple[int, int]] = {}
+    closed: set[int] = set()
+
+    while heap:
+        _, node = heapq.heappop(heap)
+        if node in closed:
+            continue
+        closed.add(node)
+        if node == target:
+            break
+
+        cost = best[node]
+        for edge in range(indptr[node], indptr[node + 1]):
+            nxt = neighbors[edge]
+            segment_idx = edge_segment[edge]
+            nxt_cost = cost + weights[segment_idx]
+            if nxt_cost < best.get(nxt, _INF):
+                best[nxt] = nxt_cost
+                parent[nxt] = (node, segment_idx)
+                heapq.heappush(heap, (nxt_cost + hypot(xs[nxt] - tx, ys[nxt] - ty) * cost_per_km, nxt))
+
+    if target not in parent and source != target:
+        return [], _INF, len(closed)
+    return _unwind(parent, source, target), best.get(target, 0.0), len(closed)
+
+
+def bidirectional_dijkstra(graph: RoadGraph, weights: Sequence[float], source: int, target: int) -> PathResult:
+    """Dijkstra grown from both ends, alternating on the smaller frontier.
+
+    Segments are two-way, so the backward search runs on the same graph. The
+    search stops once the two frontier minima together cannot beat the best
+    meeting point found so far, or as soon as either side runs out of nodes
+    (the target is unreachable).
+    """
+    if source == target:
+        return [], 0.0, 0
+    indptr, neighbors, edge_segment = _csr_views(graph)
+    heaps: tuple[list[tuple[float, int]], list[tuple[float, int]]] = ([(0.0, source)], [(0.0, target)])
+    bests: tuple[dict[int, float], dict[int, float]] = ({source: 0.0}, {target: 0.0})
+    parents: tuple[dict[int, tuple[int, int]], dict[int, tuple[int, int]]] = ({}, {})
+    settled = 0
+    best_total = _INF
+    meeting = -1
+
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best_total:
+            break
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        heap, best, parent, other_best = heaps[side], bests[side], parents[side], bests[1 - side]
+
+        cost, node = heapq.heappop(heap)
+        if cost > best.get(node, _INF):
+            continue
+        settled += 1
+
+        for edge in range(indptr[node], indptr[node + 1]):
+            nxt = neighbors[edge]
+            segment_idx = edge_segment[edge]
+            nxt_cost = cost + weights[segment_idx]
+            if nxt_cost < best.get(nxt, _INF):
+                best[nxt] = nxt_cost
+                parent[nxt] = (node, segment_idx)
+                heapq.heappush(heap, (nxt_cost, nxt))
+                if nxt in other_best and nxt_cost + other_best[nxt] < best_total:
+                    best_total = nxt_cost + other_best[nxt]
+                    meeting = nxt
+
+    if meeting < 0:
+        return [], _INF, settled
+    backward = _unwind(parents[1], target, meeting)
+    backward.reverse()
+    return _unwind(parents[0], source, meeting) + backward, best_total, settled
+
+
+def one_to_many(graph: RoadGraph, weights: Sequence[float], source: int, targets: Sequence[int]) -> list[float]:
+    """Costs from `source` to each of `targets` (inf when unreachable).
+
+    One Dijkstra run that stops as soon as every distinct target is settled.
+    """
+    indptr, neighbors, edge_segment = _csr_views(graph)
+    heap: list[tuple[float, int]] = [(0.0, source)]
+    best = {source: 0.0}
+    remaining = set(targets)
+
+    while heap and remaining:
+        cost, node = heapq.heappop(heap)
+        if cost > best.get(node, _INF):
+            continue
+        remaining.discard(node)
+
+        for edge in range(indptr[node], indptr[node + 1]):
+            nxt = neighbors[edge]
+            nxt_cost = cost + weights[edge_segment[edge]]
+            if nxt_cost < best.get(nxt, _INF):
+                best[nxt] = nxt_cost
+                heapq.heappush(heap, (nxt_cost, nxt))
+
+    return [best.get(target, _INF) for target in targets]
+
+
+def time_dependent_dijkstra(
+    graph: RoadGraph,
+    horizons: Sequence[float],
+    base: Sequence[Sequence[float]],
+    slope: Sequence[Sequence[float]],
+    source: int,
+    target: int,
+) -> PathResult:
+    """Earliest-arrival Dijkstra where a segment's cost depends on when it is entered.
+
+    Entering segment `s` at `t` minutes after departure, with
+    `horizons[k] <= t < horizons[k + 1]`, costs `base[k][s] + slope[k][s] * (t - horizons[k])`;
+    the last bracket (with zero slope) covers everything past the final
+    horizon. The returned cost is the arrival time at `target`.
+    """
+    indptr, neighbors, edge_segment = _csr_views(graph)
+    last = len(horizons) - 1
+    heap: list[tuple[float, int]] = [(0.0, source)]
+    best = {source: 0.0}
+    parent: dict[int, tuple[int, int]] = {}
+    settled = 0
+
+    while heap:
+        arrival, node = heapq.heappop(heap)
+        if arrival > best.get(node, _INF):
+            continue
+        settled += 1
+        if node == target:
+            break
+
+        bracket = min(bisect.bisect_right(horizons, arrival) - 1, last)
+        bracket_base, bracket_slope = base[bracket], slope[bracket]
+        offset = arrival - horizons[bracket]
+        for edge in range(indptr[node], indptr[node + 1]):
+            nxt = neighbors[edge]
+            segment_idx = edge_segment[edge]
+            nxt_arrival = arrival + bracket_base[segment_idx] + bracket_slope[segment_idx] * offset
+            if nxt_arrival < best.get(nxt, _INF):
+                best[nxt] = nxt_arrival
+                parent[nxt] = (node, segment_idx)
+                heapq.heappush(heap, (nxt_arrival, nxt))
+
+    if target not in parent and source != target:
+        return [], _INF, settled
+    return _unwind(parent, source, target), best.get(target, 0.0), settled
+
+
+def shortest_path_tree(
+    graph: RoadGraph,
+    weights: Sequence[float],
+    source: int,
+    budget: float = _INF,
+    target: int = -1,
+    stretch: float = 0.0,
+) -> tuple[dict[int, float], dict[int, tuple[int, int]]]:
+    """Settled costs and `(parent, segment)` links of every node within `budget` of `source`.
+
+    When `target` is given, the budget tightens to `(1 + stretch)` times the
+    target's cost as soon as it is settled.
+    """
+    indptr, neighbors, edge_segment = _csr_views(graph)
+    heap: list[tuple[float, int]] = [(0.0, source)]
+    best = {source: 0.0}
+    parent: dict[int, tuple[int, int]] = {}
+    settled: dict[int, float] = {}
+
+    while heap:
+        cost, node = heapq.heappop(heap)
+        if cost > budget:
+            break
+        if node in settled:
+            continue
+        settled[node] = cost
+        if node == target:
+            budget = min(budget, cost * (1.0 + stretch))
+
+        for edge in range(indptr[node], indptr[node + 1]):
+            nxt = neighbors[edge]
+            segment_idx = edge_segment[edge]
+            nxt_cost = cost + weights[segment_idx]
+            if nxt_cost <= budget and nxt_cost < best.get(nxt, _INF):
+                best[nxt] = nxt_cost
+                parent[nxt] = (node, segment_idx)
+                heapq.heappush(heap, (nxt_cost, nxt))
+    return settled, {node: link for node, link in parent.items() if node in settled}
+
+
+def bounded_one_to_all(graph: RoadGraph, weights: Sequence[float], source: int, budget: float) -> dict[int, float]:
+    """Cost of every node reachable from `source` within `budget`; stops at the first node past it."""
+    return shortest_path_tree(graph, weights, source, budget)[0]
+
+
+def _tree_walk(parent: dict[int, tuple[int, int]], node: int, root: int) -> tuple[list[int], list[int]]:
+    """Segments and nodes on the tree path from `node` back to `root`, in that order."""
+    segments, nodes = [], [node]
+    while node != root:
+        node, segment_idx = parent[node]
+        segments.append(segment_idx)
+        nodes.append(node)
+    return segments, nodes
+
+
+def via_node_alternatives(
+    graph: RoadGraph,
+    weights: Sequence[float],
+    source: int,
+    target: int,
+    count: int,
+    max_stretch: float = 0.25,
+    max_overlap: float = 0.6,
+    max_candidates: int = 200,
+    primary: Sequence[int] | None = None,
+) -> tuple[list[PathResult], int]:
+    """The shortest path plus up to `count` via-node alternatives, and the nodes settled.
+
+    One forward tree (bounded at `(1 + max_stretch)` times the shortest cost
+    once the target is settled) and one backward tree with the same bound
+    give every via node `v` a candidate path `s -> v -> t` at cost
+    `d_s(v) + d_t(v)`. Candidates are taken cheapest first and kept when the
+    path is simple, within the stretch bound, and shares at most
+    `max_overlap` of its cost with each route already chosen. Via nodes on
+    a chosen route are skipped, since they mostly reproduce it.
+
+    `primary` replaces the shortest path as the first route, e.g. a cached
+    route the caller already returns; alternatives are then kept distinct
+    from it instead, and one may be cheaper than it.
+    """
+    forward, forward_parent = shortest_path_tree(graph, weights, source, target=target, stretch=max_stretch)
+    if target not in forward:
+        return [], len(forward)
+    shortest = forward[target]
+    limit = shortest * (1.0 + max_stretch)
+    backward, backward_parent = shortest_path_tree(graph, weights, target, budget=limit)
+    settled = len(forward) + len(backward)
+
+    if primary is None:
+        first_segments, first_nodes = _tree_walk(forward_parent, target, source)
+        first_segments.reverse()
+        routes: list[PathResult] = [(first_segments, shortest, 0)]
+    else:
+        first_segments, first_nodes = list(primary), [source]
+        for idx in first_segments:
+            start, end = graph.segment_nodes[idx].tolist()
+            first_nodes.append(end if first_nodes[-1] == start else start)
+        routes = [(first_segments, sum(weights[idx] for idx in first_segments), 0)]
+    chosen = [set(first_segments)]
+    covered = set(first_nodes)
+
+    candidates = sorted(
+        (cost + backward[node], node)
+        for node, cost in forward.items()
+        if node in backward and cost + backward[node] <= limit
+    )
+    examined = 0
+    for total, via in candidates:
+        if len(routes) > count or examined >= max_candidates:
+            break
+        if via in covered:
+            continue
+        examined += 1
+        head_segments, head_nodes = _tree_walk(forward_parent, via, source)
+        tail_segments, tail_nodes = _tree_walk(backward_parent, via, target)
+        if len(set(head_nodes).union(tail_nodes)) != len(head_nodes) + len(tail_nodes) - 1:
+            continue
+        head_segments.reverse()
+        segments = head_segments + tail_segments
+        if any(sum(weights[idx] for idx in segments if idx in used) > max_overlap * total for used in chosen):
+            continue
+        routes.append((segments, total, 0))
+        chosen.append(set(segments))
+        covered.update(head_nodes)
+        covered.update(tail_nodes)
+    return routes, settled
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+
+Forecast = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class PredictionCache:
+    """Whole-network forecasts for one `(tick, model_version)`, one entry per horizon.
+
+    Entries are arrays aligned with `SimulationEngine.segments`. Storing or
+    reading under a different tick or model version drops everything cached
+    for the previous key, so readers never see forecasts from an older tick or
+    a replaced model.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._key: tuple[int, int] | None = None
+        self._entries: dict[int, Forecast] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tick: int, model_version: int, horizon_minutes: int = 0) -> Forecast | None:
+        with self._lock:
+            entry = self._entries.get(horizon_minutes) if self._key == (tick, model_version) else None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, tick: int, model_version: int, horizon_minutes: int, forecast: Forecast) -> None:
+        with self._lock:
+            key = (tick, model_version)
+            if self._key != key:
+                self._key = key
+                self._entries = {}
+            self._entries[horizon_minutes] = forecast
+
+    def clear(self) -> None:
+        with self._lock:
+            self._key = None
+            self._entries = {}
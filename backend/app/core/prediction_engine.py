@@ -1,58 +1,223 @@
 from __future__ import annotations
 
-from collections import defaultdict, deque
 from datetime import UTC, datetime
-from typing import Any
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import time
+from typing import Any, Callable
 
 import numpy as np
-import pandas as pd
 from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
+from app.core.feature_engineering import FEATURE_COLUMNS, FEATURE_INDEX
+from app.core.online_learning import OnlineRLSRegressor
+from app.core.prediction_cache import Forecast, PredictionCache
+from app.core.training_store import TrainingStore
+from app.core.tree_inference import SMALL_BATCH_ROWS, CompiledTreeEnsemble
 
-FEATURE_COLUMNS = [
-    "hour",
-    "day_of_week",
-    "lag_1",
-    "lag_3",
-    "lag_6",
-    "rolling_mean_15",
-    "rolling_mean_60",
-    "rolling_std_15",
-    "capacity_ratio",
-    "incident_flag",
-    "rush_hour",
-]
+
+LEARNING_MODES = {"batch", "online"}
+INFERENCE_BACKENDS = {"compiled", "sklearn"}
+ONLINE_MIN_ROWS = 500
+
+_LAG_1 = FEATURE_INDEX["lag_1"]
+_ROLLING_MEAN_15 = FEATURE_INDEX["rolling_mean_15"]
+
+# Candidate name -> (estimator factory, estimators added per stage, total estimators).
+# Ensembles are grown with warm_start so a fit can stop between stages; stages
+# are kept small so the budget check between them is fine-grained.
+CANDIDATES = {
+    "linear_regression": (LinearRegression, 0, 0),
+    "random_forest": (lambda: RandomForestRegressor(n_estimators=0, random_state=42, n_jobs=1, warm_start=True), 1, 120),
+    "gradient_boosting": (lambda: GradientBoostingRegressor(n_estimators=0, random_state=42, warm_start=True), 5, 100),
+}
+
+# Time a candidate process gets past its budget (process start-up, the stage
+# in flight, sending the model back) before it is terminated.
+CANDIDATE_GRACE_SECONDS = 10.0
+
+# Best validation RMSE seen by any candidate in the current train() call.
+# Candidate processes receive it as an argument.
+_shared_best_rmse = None
+
+
+def _init_training_worker(best_rmse) -> None:
+    global _shared_best_rmse
+    _shared_best_rmse = best_rmse
+
+
+def _offer_best_rmse(rmse: float) -> float:
+    lock = _shared_best_rmse.get_lock()
+    if not lock.acquire(timeout=1.0):
+        # The holder was terminated mid-update; treat the shared value as read-only.
+        return min(rmse, _shared_best_rmse.value)
+    try:
+        if rmse < _shared_best_rmse.value:
+            _shared_best_rmse.value = rmse
+        return _shared_best_rmse.value
+    finally:
+        lock.release()
+
+
+def _fit_online_by_tick(model: OnlineRLSRegressor, x: np.ndarray, y: np.ndarray, ticks: np.ndarray) -> OnlineRLSRegressor:
+    """Replay tick-ordered rows into `model` one tick per update, as the scheduler would have."""
+    edges = [0, *(np.flatnonzero(np.diff(ticks)) + 1).tolist(), len(y)]
+    for lo, hi in zip(edges, edges[1:]):
+        model.partial_fit(x[lo:hi], y[lo:hi])
+    return model
+
+
+def _fit_candidate(
+    name: str,
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    x_test: np.ndarray,
+    y_test: np.ndarray,
+    budget_seconds: float,
+) -> dict[str, Any]:
+    """Fit one candidate stage by stage within `budget_seconds`.
+
+    After each stage the candidate is abandoned if even repeating its last
+    improvement for every remaining stage could not beat the best RMSE
+    reported by any candidate so far.
+    """
+    factory, stage_size, total = CANDIDATES[name]
+    model = factory()
+    started = time.perf_counter()
+    stages = max(1, total // stage_size) if stage_size else 1
+    status = "completed"
+    previous_rmse = float("inf")
+    rmse = float("inf")
+
+    # A forest predicts the mean of its trees, so only the trees added by a stage are evaluated.
+    tree_sum = np.zeros(len(y_test)) if isinstance(model, RandomForestRegressor) else None
+
+    for stage in range(1, stages + 1):
+        if stage_size:
+            model.set_params(n_estimators=stage * stage_size)
+        model.fit(x_train, y_train)
+        if tree_sum is None:
+            predicted = model.predict(x_test)
+        else:
+            for tree in model.estimators_[(stage - 1) * stage_size :]:
+                tree_sum += tree.predict(x_test)
+            predicted = tree_sum / len(model.estimators_)
+        rmse = float(np.sqrt(mean_squared_error(y_test, predicted)))
+        best = _offer_best_rmse(rmse)
+
+        remaining = stages - stage
+        if remaining == 0:
+            break
+        if time.perf_counter() - started >= budget_seconds:
+            status = "budget_exhausted"
+            break
+        improvement = max(previous_rmse - rmse, 0.0) if stage > 1 else rmse
+        if rmse > best and rmse - improvement * remaining > best:
+            status = "abandoned"
+            break
+        previous_rmse = rmse
+
+    return {
+        "name": name,
+        "model": None if status == "abandoned" else model,
+        "rmse": rmse,
+        "fit_seconds": round(time.perf_counter() - started, 4),
+        "stages": stage,
+        "status": status,
+    }
+
+
+def _candidate_process(connection, best_rmse, name: str, *args) -> None:
+    _init_training_worker(best_rmse)
+    try:
+        result = _fit_candidate(name, *args)
+    except Exception as exc:
+        result = _failed_candidate(name, f"failed: {exc.__class__.__name__}")
+    connection.send(result)
+    connection.close()
+
+
+def _failed_candidate(name: str, status: str) -> dict[str, Any]:
+    return {"name": name, "model": None, "rmse": None, "fit_seconds": None, "stages": 0, "status": status}
 
 
 class PredictionEngine:
-    def __init__(self) -> None:
-        self.max_rows = 20000
-        self.max_segment_history = 720
-        self.rows = deque(maxlen=self.max_rows)
+    def __init__(
+        self,
+        max_rows: int = 2_000_000,
+        training_workers: int | None = None,
+        candidate_budget_seconds: float = 60.0,
+        candidate_max_rows: int = 250_000,
+        learning_mode: str = "batch",
+        inference_backend: str = "compiled",
+    ) -> None:
+        if learning_mode not in LEARNING_MODES:
+            raise ValueError(f"learning_mode must be one of {sorted(LEARNING_MODES)}")
+        if inference_backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"inference_backend must be one of {sorted(INFERENCE_BACKENDS)}")
+        self.learning_mode = learning_mode
+        self.inference_backend = inference_backend
+        self.max_rows = max_rows
+        self.training_workers = len(CANDIDATES) if training_workers is None else max(0, training_workers)
+        self.candidate_budget_seconds = candidate_budget_seconds
+        self.candidate_max_rows = candidate_max_rows
+        self.rows = TrainingStore(self.max_rows, len(FEATURE_COLUMNS))
         self.model = None
         self.model_name = "untrained"
-        self.metrics: dict[str, float] = {}
+        # (model, compiled ensemble) for single rows and small batches; replaced as a unit.
+        self._compiled: tuple[Any, CompiledTreeEnsemble] | None = None
+        # Bumped whenever predictions for the same features may change.
+        self.model_version = 0
+        self.cache = PredictionCache()
+        self.metrics: dict[str, Any] = {}
         self.residual_std = 0.07
         self.last_retrained_at: datetime | None = None
         self.retrain_interval_ticks = 900
-        self.segment_series = defaultdict(lambda: deque(maxlen=self.max_segment_history))
+        self.online_model = OnlineRLSRegressor(len(FEATURE_COLUMNS))
 
     def add_observation(self, features: dict[str, Any], target: float, tick: int) -> None:
-        row = {k: features[k] for k in FEATURE_COLUMNS if k in features}
-        row["target"] = float(target)
-        row["tick"] = int(tick)
-        row["segment_id"] = int(features["segment_id"])
-        self.rows.append(row)
-        self.segment_series[row["segment_id"]].append(float(target))
-
-    def _build_dataset(self) -> pd.DataFrame:
-        if not self.rows:
-            return pd.DataFrame(columns=[*FEATURE_COLUMNS, "target", "tick", "segment_id"])
-        return pd.DataFrame(list(self.rows))
+        self.add_observations(
+            np.array([[features.get(k, 0.0) for k in FEATURE_COLUMNS]], dtype=np.float64),
+            targets=np.array([target], dtype=np.float64),
+            segment_ids=np.array([features["segment_id"]], dtype=np.int64),
+            tick=tick,
+        )
+
+    def add_observations(self, matrix: np.ndarray, targets: np.ndarray, segment_ids: np.ndarray, tick: int) -> None:
+        """Record one tick of observations from a `FEATURE_COLUMNS`-ordered matrix."""
+        self.rows.append_block(matrix, targets, int(tick), segment_ids)
+
+        # Only a serving (or, in online mode, warming) learner is updated: each update changes its
+        # predictions, so it bumps `model_version` and invalidates every downstream cache.
+        if self.learning_mode == "online":
+            self.online_model.partial_fit(matrix, np.asarray(targets, dtype=np.float64))
+            self._refresh_online_model()
+        elif self.model is self.online_model:
+            self.online_model.partial_fit(matrix, np.asarray(targets, dtype=np.float64))
+            self.model_version += 1
+
+    def _refresh_online_model(self) -> None:
+        online = self.online_model
+        if online.n_seen < ONLINE_MIN_ROWS or online.prequential_rmse is None:
+            return
+        if self.model is not online:
+            self._install_model(online, "online_rls")
+        self.residual_std = online.prequential_rmse
+        self.model_version += 1
+        self.metrics = {
+            "rmse": online.prequential_rmse,
+            "rows": online.n_seen,
+            "learning_mode": "online",
+        }
+        if self.last_retrained_at is None:
+            self.last_retrained_at = datetime.now(UTC)
 
     def maybe_retrain(self, tick: int) -> None:
+        if self.learning_mode == "online":
+            return
         if len(self.rows) < 500:
             return
         if self.last_retrained_at and tick % self.retrain_interval_ticks != 0:
@@ -60,56 +225,66 @@ class PredictionEngine:
         self.train()
 
     def train(self) -> None:
-        data = self._build_dataset().sort_values("tick")
-        if len(data) < 500:
+        # The store is already in tick order, so the split is a pair of slices.
+        data = self.rows.columns()
+        features = data["features"]
+        targets = data["target"].astype(np.float64)
+        if len(targets) < 500:
             return
 
-        split_index = int(len(data) * 0.8)
-        train = data.iloc[:split_index]
-        test = data.iloc[split_index:]
-        if test.empty:
+        split_index = int(len(targets) * 0.8)
+        x_train, x_test = features[:split_index], features[split_index:]
+        y_train, y_test = targets[:split_index], targets[split_index:]
+        if len(y_test) == 0:
             return
 
-        x_train = train[FEATURE_COLUMNS]
-        y_train = train["target"]
-        x_test = test[FEATURE_COLUMNS]
-        y_test = test["target"]
+        lag_1 = x_test[:, _LAG_1]
+        rolling_mean_15 = x_test[:, _ROLLING_MEAN_15]
 
-        candidates = {
-            "linear_regression": LinearRegression(),
-            "random_forest": RandomForestRegressor(n_estimators=120, random_state=42, n_jobs=1),
-            "gradient_boosting": GradientBoostingRegressor(random_state=42),
-        }
+        baseline_last = float(np.sqrt(mean_squared_error(y_test, lag_1)))
+        baseline_roll = float(np.sqrt(mean_squared_error(y_test, rolling_mean_15)))
+
+        results = self._fit_candidates(x_train, y_train, x_test, y_test, min(baseline_last, baseline_roll))
+        online_started = time.perf_counter()
+        if self.learning_mode == "online":
+            # Already current, and it has seen the test rows: it competes on its predict-then-update error.
+            online_model, online_rmse = self.online_model, self.online_model.prequential_rmse
+        else:
+            online_model = _fit_online_by_tick(OnlineRLSRegressor(len(FEATURE_COLUMNS)), x_train, y_train, data["tick"][:split_index])
+            online_rmse = float(np.sqrt(mean_squared_error(y_test, online_model.predict(x_test))))
+            # Bring it up to date so it can keep learning tick by tick if it is selected.
+            _fit_online_by_tick(online_model, x_test, y_test, data["tick"][split_index:])
+        if online_rmse is not None and online_model.n_seen >= ONLINE_MIN_ROWS:
+            results.append(
+                {
+                    "name": "online_rls",
+                    "model": online_model,
+                    "rmse": online_rmse,
+                    "fit_seconds": round(time.perf_counter() - online_started, 4),
+                    "stages": 0,
+                    "status": "online" if online_model is self.online_model else "completed",
+                }
+            )
 
         best_name = "baseline_last"
         best_rmse = float("inf")
         best_model = None
-
-        for name, model in candidates.items():
-            model.fit(x_train, y_train)
-            pred = model.predict(x_test)
-            rmse = float(np.sqrt(mean_squared_error(y_test, pred)))
-            if rmse < best_rmse:
-                best_rmse = rmse
-                best_name = name
-                best_model = model
-
-        baseline_last = float(np.sqrt(mean_squared_error(y_test, x_test["lag_1"])))
-        baseline_roll = float(np.sqrt(mean_squared_error(y_test, x_test["rolling_mean_15"])))
+        for result in results:
+            if result["model"] is not None and result["rmse"] < best_rmse:
+                best_rmse = result["rmse"]
+                best_name = result["name"]
+                best_model = result["model"]
 
         if baseline_last <= best_rmse:
-            self.model = None
-            self.model_name = "baseline_last"
-            predictions = x_test["lag_1"].to_numpy()
+            selected_model, selected_name = None, "baseline_last"
+            predictions = lag_1
         elif baseline_roll <= best_rmse:
-            self.model = None
-            self.model_name = "baseline_rolling_mean_15"
-            predictions = x_test["rolling_mean_15"].to_numpy()
+            selected_model, selected_name = None, "baseline_rolling_mean_15"
+            predictions = rolling_mean_15
         else:
             if best_model is None:
                 return
-            self.model = best_model
-            self.model_name = best_name
+            selected_model, selected_name = best_model, best_name
             predictions = best_model.predict(x_test)
 
         self.metrics = {
@@ -118,32 +293,136 @@ class PredictionEngine:
             "r2": float(r2_score(y_test, predictions)),
             "baseline_last_rmse": baseline_last,
             "baseline_rolling_rmse": baseline_roll,
-            "rows": int(len(data)),
+            "rows": int(len(targets)),
+            "candidates": {
+                result["name"]: {
+                    "rmse": result["rmse"],
+                    "fit_seconds": result["fit_seconds"],
+                    "stages": result["stages"],
+                    "status": result["status"],
+                }
+                for result in results
+            },
         }
-        residuals = y_test.to_numpy() - np.array(predictions)
+        residuals = y_test - np.asarray(predictions)
         self.residual_std = float(np.std(residuals)) if len(residuals) > 1 else 0.07
+        if selected_name == "online_rls":
+            self.online_model = selected_model
+        self._install_model(selected_model, selected_name)
         self.last_retrained_at = datetime.now(UTC)
 
+    def _install_model(self, model: Any, name: str) -> None:
+        """Swap in a new serving model, compiling tree ensembles for small-batch inference."""
+        compiled = None
+        if model is not None and self.inference_backend == "compiled":
+            ensemble = CompiledTreeEnsemble.from_sklearn(model)
+            if ensemble is not None:
+                compiled = (model, ensemble)
+        self._compiled = compiled
+        self.model = model
+        self.model_name = name
+        self.model_version += 1
+
+    def _fit_candidates(
+        self,
+        x_train: np.ndarray,
+        y_train: np.ndarray,
+        x_test: np.ndarray,
+        y_test: np.ndarray,
+        rmse_to_beat: float,
+    ) -> list[dict[str, Any]]:
+        context = multiprocessing.get_context("spawn")
+        best_rmse = context.Value("d", rmse_to_beat)
+        budget = self.candidate_budget_seconds
+        if len(y_train) > self.candidate_max_rows:
+            # Evenly spaced rows keep the whole tick range while bounding stage time and the copy to each process.
+            keep = np.linspace(0, len(y_train) - 1, self.candidate_max_rows).astype(np.int64)
+            x_train, y_train = x_train[keep], y_train[keep]
+
+        if self.training_workers == 0:
+            _init_training_worker(best_rmse)
+            return [_fit_candidate(name, x_train, y_train, x_test, y_test, budget) for name in CANDIDATES]
+
+        # One process per candidate, so one that overruns its budget can be terminated.
+        workers = min(self.training_workers, len(CANDIDATES), os.cpu_count() or 1)
+        queued = list(CANDIDATES)
+        running: dict[Any, tuple[str, Any, float]] = {}
+        results = []
+        try:
+            while queued or running:
+                while queued and len(running) < workers:
+                    name = queued.pop(0)
+                    receiver, sender = context.Pipe(duplex=False)
+                    process = context.Process(
+                        target=_candidate_process,
+                        args=(sender, best_rmse, name, x_train, y_train, x_test, y_test, budget),
+                        daemon=True,
+                    )
+                    process.start()
+                    sender.close()
+                    running[receiver] = (name, process, time.perf_counter() + budget + CANDIDATE_GRACE_SECONDS)
+
+                timeout = max(min(deadline for _, _, deadline in running.values()) - time.perf_counter(), 0.0)
+                for receiver in wait(list(running), timeout=timeout):
+                    name, process, _ = running.pop(receiver)
+                    try:
+                        results.append(receiver.recv())
+                    except EOFError:
+                        results.append(_failed_candidate(name, f"failed: exit code {process.exitcode}"))
+                    receiver.close()
+                    process.join()
+
+                now = time.perf_counter()
+                for receiver, (name, process, deadline) in list(running.items()):
+                    if now >= deadline:
+                        del running[receiver]
+                        process.terminate()
+                        process.join()
+                        receiver.close()
+                        results.append(_failed_candidate(name, "timed_out"))
+        finally:
+            for receiver, (_, process, _) in running.items():
+                process.terminate()
+                process.join()
+                receiver.close()
+        return sorted(results, key=lambda result: list(CANDIDATES).index(result["name"]))
+
+    def forecast(
+        self,
+        tick: int,
+        build_features: Callable[[], np.ndarray],
+        horizon_minutes: int = 0,
+    ) -> Forecast:
+        """Network forecast for `tick`, computed at most once per tick, model version and horizon."""
+        version = self.model_version
+        cached = self.cache.get(tick, version, horizon_minutes)
+        if cached is None:
+            cached = self.predict_batch(build_features())
+            self.cache.put(tick, version, horizon_minutes, cached)
+        return cached
+
     def predict(self, features: dict[str, Any]) -> tuple[float, float, float]:
-        x = pd.DataFrame([{k: features.get(k, 0.0) for k in FEATURE_COLUMNS}])
+        x = np.array([[features.get(k, 0.0) for k in FEATURE_COLUMNS]], dtype=np.float64)
+        pred, lower, upper = self.predict_batch(x)
+        return float(pred[0]), float(lower[0]), float(upper[0])
 
+    def predict_batch(self, matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Score a `FEATURE_COLUMNS`-ordered matrix in one call; returns prediction, lower and upper arrays."""
         if self.model_name == "baseline_last":
-            pred = float(x.iloc[0]["lag_1"])
-        elif self.model_name == "baseline_rolling_mean_15":
-            pred = float(x.iloc[0]["rolling_mean_15"])
-        elif self.model is not None:
-            pred = float(self.model.predict(x)[0])
+            pred = matrix[:, _LAG_1]
+        elif self.model_name == "baseline_rolling_mean_15" or self.model is None:
+            pred = matrix[:, _ROLLING_MEAN_15]
         else:
-            pred = float(x.iloc[0]["rolling_mean_15"])
+            model = self.model
+            compiled = self._compiled
+            # Whole-network batches stay on sklearn, which is faster at that size.
+            if compiled is not None and compiled[0] is model and len(matrix) <= SMALL_BATCH_ROWS:
+                pred = compiled[1].predict(matrix)
+            else:
+                pred = model.predict(matrix)
 
-        pred = min(max(pred, 0.0), 1.0)
+        pred = np.clip(pred, 0.0, 1.0)
         ci = 1.96 * max(self.residual_std, 0.03)
-        lower = min(max(pred - ci, 0.0), 1.0)
-        upper = min(max(pred + ci, 0.0), 1.0)
+        lower = np.clip(pred - ci, 0.0, 1.0)
+        upper = np.clip(pred + ci, 0.0, 1.0)
         return pred, lower, upper
-
-    def get_segment_history(self, segment_id: int, limit: int = 120) -> list[float]:
-        history = self.segment_series.get(segment_id)
-        if history is None:
-            return []
-        return list(history)[-limit:]
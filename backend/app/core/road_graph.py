@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.ingestion.osm_loader import Segment
+
+
+@dataclass(frozen=True, slots=True)
+class RoadGraph:
+    """Immutable CSR road graph with dense integer node ids.
+
+    The outgoing edges of node `u` are `neighbors[indptr[u]:indptr[u + 1]]`,
+    and `edge_segment` holds each edge's index in the segment list the graph
+    was built from. Segments are two-way, so every segment yields one edge in
+    each direction and the graph is its own reverse.
+    """
+
+    indptr: np.ndarray
+    neighbors: np.ndarray
+    edge_segment: np.ndarray
+    node_lat: np.ndarray
+    node_lon: np.ndarray
+    segment_nodes: np.ndarray
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_lat)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.neighbors)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            array.nbytes
+            for array in (self.indptr, self.neighbors, self.edge_segment, self.node_lat, self.node_lon, self.segment_nodes)
+        )
+
+    @classmethod
+    def from_segments(cls, segments: list[Segment]) -> RoadGraph:
+        """Merge segment endpoints that agree to 4 decimal places into nodes, in first-seen order."""
+        endpoints = np.array(
+            [
+                coord
+                for segment in segments
+                for coord in ((segment.start_lat, segment.start_lon), (segment.end_lat, segment.end_lon))
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        _, first_seen, inverse = np.unique(np.round(endpoints, 4), axis=0, return_index=True, return_inverse=True)
+        order = np.argsort(first_seen, kind="stable")
+        dense_id = np.empty(len(order), dtype=np.int32)
+        dense_id[order] = np.arange(len(order), dtype=np.int32)
+        segment_nodes = dense_id[inverse.ravel()].reshape(-1, 2)
+        node_coords = endpoints[first_seen[order]]
+
+        # Interleave both directions per segment so a stable sort keeps each
+        # node's edges in segment order.
+        sources = segment_nodes.ravel()
+        targets = segment_nodes[:, ::-1].ravel()
+        edge_segment = np.repeat(np.arange(len(segments), dtype=np.int32), 2)
+        by_source = np.argsort(sources, kind="stable")
+
+        indptr = np.zeros(len(node_coords) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(node_coords)), out=indptr[1:])
+        return cls(
+            indptr=indptr,
+            neighbors=targets[by_source].astype(np.int32),
+            edge_segment=edge_segment[by_source],
+            node_lat=np.ascontiguousarray(node_coords[:, 0]),
+            node_lon=np.ascontiguousarray(node_coords[:, 1]),
+            segment_nodes=segment_nodes,
+        )
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+import threading
+
+
+@dataclass(frozen=True, slots=True)
+class CachedRoute:
+    """Segment paths per weight mode and their summed costs when they were computed."""
+
+    segments: dict[str, list[int]]
+    costs: dict[str, float]
+
+
+class RouteCache:
+    """Bounded LRU of computed routes keyed on snapped `(source, target)` nodes.
+
+    An entry is served while, for every weight mode, the summed cost of its
+    segments under the current weights is within `tolerance` (relative) of
+    the cost it was computed with; past that the route may no longer be the
+    best one, so it is dropped. Injecting an incident on any of an entry's
+    segments drops it immediately.
+
+    An incident only shows in the weights from the next tick on, so routes
+    computed from a snapshot of the incident's tick or earlier are refused
+    when stored; otherwise a query in between would re-cache the route the
+    incident just invalidated.
+    """
+
+    def __init__(self, max_entries: int = 1024, tolerance: float = 0.05) -> None:
+        self.max_entries = max_entries
+        self.tolerance = tolerance
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, CachedRoute] = OrderedDict()
+        self._by_segment: dict[int, set[Hashable]] = {}
+        # Segment -> tick of its latest incident.
+        self._incident_ticks: dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+        self.refused = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: Hashable, weights: dict[str, list[float]]) -> CachedRoute | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._within_tolerance(entry, weights):
+                self._remove(key)
+                self.stale += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _within_tolerance(self, entry: CachedRoute, weights: dict[str, list[float]]) -> bool:
+        for mode, segments in entry.segments.items():
+            mode_weights = weights[mode]
+            cost = sum(mode_weights[idx] for idx in segments)
+            base = entry.costs[mode]
+            if abs(cost - base) > self.tolerance * base:
+                return False
+        return True
+
+    def store(self, key: Hashable, entry: CachedRoute, tick: int | None = None) -> None:
+        """Cache `entry`, computed from a snapshot of `tick`, unless an incident on its route is newer."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if tick is not None and any(
+                self._incident_ticks.get(idx, -1) >= tick for segments in entry.segments.values() for idx in segments
+            ):
+                self.refused += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for segments in entry.segments.values():
+                for idx in segments:
+                    self._by_segment.setdefault(idx, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_segment(self, segment_idx: int, tick: int | None = None) -> None:
+        """Drop every entry over `segment_idx`; with `tick`, also refuse routes over it from snapshots up to `tick`."""
+        with self._lock:
+            if tick is not None:
+                self._incident_ticks[segment_idx] = tick
+            for key in list(self._by_segment.get(segment_idx, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        for segments in entry.segments.values():
+            for idx in segments:
+                keys = self._by_segment.get(idx)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._by_segment[idx]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_segment.clear()
+            self._incident_ticks.clear()
+
+    def stats(self) -> dict[str, float | int]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "tolerance": self.tolerance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "invalidations": self.invalidations,
+                "refused": self.refused,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
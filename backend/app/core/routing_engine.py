@@ -1,15 +1,62 @@
 from __future__ import annotations
 
-import heapq
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import math
+import multiprocessing
+import os
+import threading
+from dataclasses import dataclass, field
 from datetime import timedelta
 from typing import Any
 
-from app.core.feature_engineering import build_feature_row
+import numpy as np
+from scipy.spatial import cKDTree
+
+from app.core.contraction_hierarchy import CCHMetric, ContractionHierarchy
+from app.core.path_search import (
+    PathResult,
+    astar,
+    bidirectional_dijkstra,
+    bounded_one_to_all,
+    dijkstra,
+    one_to_many,
+    time_dependent_dijkstra,
+    via_node_alternatives,
+)
 from app.core.prediction_engine import PredictionEngine
+from app.core.road_graph import RoadGraph
+from app.core.route_cache import CachedRoute, RouteCache
 from app.core.simulation_engine import SimulationEngine
 
 
+PREDICTION_HORIZON_MINUTES = 12
+TIME_DEPENDENT_HORIZONS = (0, 5, 10, 15, 30)
+ISOCHRONE_CACHE_SIZE = 256
+ALTERNATIVE_MAX_STRETCH = 0.25
+ALTERNATIVE_MAX_OVERLAP = 0.6
+SEARCH_ALGORITHMS = {"dijkstra", "astar", "bidirectional", "cch"}
+
+
+_worker_graph: RoadGraph | None = None
+
+
+def _init_matrix_worker(graph: RoadGraph) -> None:
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _matrix_rows(
+    sources: list[int], targets: list[int], weights: dict[str, list[float]], graph: RoadGraph | None = None
+) -> dict[str, list[list[float]]]:
+    """One one-to-many search per source and weight mode; runs in matrix workers or in-process."""
+    graph = graph if graph is not None else _worker_graph
+    return {
+        mode: [one_to_many(graph, mode_weights, source, targets) for source in sources]
+        for mode, mode_weights in weights.items()
+    }
+
+
 def _distance_km(a_lat: float, a_lon: float, b_lat: float, b_lon: float) -> float:
     r = 6371.0
     x = math.radians(b_lon - a_lon) * math.cos(math.radians((a_lat + b_lat) / 2))
@@ -17,122 +64,437 @@ def _distance_km(a_lat: float, a_lon: float, b_lat: float, b_lon: float) -> floa
     return math.sqrt(x * x + y * y) * r
 
 
+def _project_km(lat: np.ndarray, lon: np.ndarray, ref_lat: float) -> np.ndarray:
+    """Equirectangular projection to kilometres; matches `_distance_km` at city scale."""
+    r = 6371.0
+    return np.column_stack((np.radians(lon) * math.cos(math.radians(ref_lat)) * r, np.radians(lat) * r))
+
+
+@dataclass(frozen=True, slots=True)
+class CostSnapshot:
+    """Per-segment travel times (minutes) and congestion for one tick.
+
+    Arrays are indexed like `SimulationEngine.segments`; the list copies feed
+    the Python search loops, where list indexing is cheaper than NumPy scalar
+    access. A query keeps using the snapshot it started with even if the
+    simulation ticks meanwhile. With the `cch` search algorithm, `metrics`
+    holds the contraction hierarchy customized for each weight mode.
+    """
+
+    tick: int
+    model_version: int
+    current: np.ndarray
+    predicted: np.ndarray
+    congestion: np.ndarray
+    weights: dict[str, list[float]]
+    metrics: dict[str, CCHMetric] = field(default_factory=dict)
+
+
+@dataclass(frozen=True, slots=True)
+class HorizonCosts:
+    """Per-segment travel minutes at each of `horizons` minutes ahead, for one tick.
+
+    Row 0 is the live travel time; later rows come from the forecast at that
+    horizon. `base`/`slope` are the per-bracket interpolation terms consumed
+    by `time_dependent_dijkstra`, precomputed so the search only indexes
+    lists.
+    """
+
+    tick: int
+    model_version: int
+    horizons: tuple[int, ...]
+    table: np.ndarray
+    base: list[list[float]]
+    slope: list[list[float]]
+
+
 class RoutingEngine:
-    def __init__(self, simulation_engine: SimulationEngine, prediction_engine: PredictionEngine) -> None:
+    def __init__(
+        self,
+        simulation_engine: SimulationEngine,
+        prediction_engine: PredictionEngine,
+        search_algorithm: str = "astar",
+        route_cache_size: int = 1024,
+        route_cache_tolerance: float = 0.05,
+        matrix_workers: int = 2,
+        matrix_parallel_pairs: int = 2500,
+    ) -> None:
+        if search_algorithm not in SEARCH_ALGORITHMS:
+            raise ValueError(f"search_algorithm must be one of {sorted(SEARCH_ALGORITHMS)}")
         self.simulation_engine = simulation_engine
         self.prediction_engine = prediction_engine
-        self.graph: dict[int, list[tuple[int, int]]] = {}
-        self.node_coords: dict[int, tuple[float, float]] = {}
-        self.segment_nodes: dict[int, tuple[int, int]] = {}
+        self.search_algorithm = search_algorithm
+        self._snapshot: CostSnapshot | None = None
+        # Rebuilds are serialized so concurrent requests never repeat one; once
+        # the scheduler drives `refresh_snapshot`, requests stop rebuilding.
+        self._snapshot_lock = threading.Lock()
+        self._refreshed_in_background = False
+        self._horizon_costs: HorizonCosts | None = None
+        self.route_cache = RouteCache(max_entries=route_cache_size, tolerance=route_cache_tolerance)
+        simulation_engine.incident_listeners.append(
+            lambda segment_idx: self.route_cache.invalidate_segment(segment_idx, simulation_engine.tick_count)
+        )
+        # Matrices with at least `matrix_parallel_pairs` cells are split across
+        # a lazily started process pool; the graph is shipped once per worker.
+        self.matrix_workers = matrix_workers
+        self.matrix_parallel_pairs = matrix_parallel_pairs
+        self._matrix_pool: ProcessPoolExecutor | None = None
+        self._matrix_pool_lock = threading.Lock()
+        # Isochrones for the current tick only, LRU-bounded; a new tick empties it.
+        self._isochrones: OrderedDict[tuple[int, int, int, float, str], dict[str, Any]] = OrderedDict()
+        self._isochrone_lock = threading.Lock()
         self._build_graph()
 
     def _build_graph(self) -> None:
-        segments = self.simulation_engine.segments
-        node_lookup: dict[tuple[float, float], int] = {}
-        node_id = 1
-
-        def get_node(lat: float, lon: float) -> int:
-            nonlocal node_id
-            key = (round(lat, 4), round(lon, 4))
-            if key not in node_lookup:
-                node_lookup[key] = node_id
-                self.node_coords[node_id] = (lat, lon)
-                self.graph[node_id] = []
-                node_id += 1
-            return node_lookup[key]
-
-        for segment in segments:
-            start_node = get_node(segment.start_lat, segment.start_lon)
-            end_node = get_node(segment.end_lat, segment.end_lon)
-            self.segment_nodes[segment.id] = (start_node, end_node)
-            self.graph[start_node].append((end_node, segment.id))
-            self.graph[end_node].append((start_node, segment.id))
+        # Graph edges carry each segment's index in `SimulationEngine.segments`.
+        self.road_graph = RoadGraph.from_segments(self.simulation_engine.segments)
+
+        # KD-tree over projected node coordinates for nearest-node snapping.
+        node_lat, node_lon = self.road_graph.node_lat, self.road_graph.node_lon
+        self._ref_lat = float(node_lat.mean()) if len(node_lat) else 0.0
+        self._node_xy = _project_km(node_lat, node_lon, self._ref_lat)
+        self._node_tree = cKDTree(self._node_xy)
+
+        # A* lower bound: no segment is traversed faster than the network's top
+        # free-flow speed, and none is shorter than its straight-line node
+        # distance (scaled down where rounding or projection says otherwise).
+        start, end = self.road_graph.segment_nodes[:, 0], self.road_graph.segment_nodes[:, 1]
+        straight_km = np.hypot(*(self._node_xy[start] - self._node_xy[end]).T)
+        length_km = self.simulation_engine.length_km
+        stretch = length_km[straight_km > 0] / straight_km[straight_km > 0]
+        min_stretch = min(1.0, float(stretch.min())) if len(stretch) else 1.0
+        max_speed = max(float(self.simulation_engine.free_flow_speed.max(initial=0.0)), 5.0)
+        self._minutes_per_km = min_stretch * 60.0 / max_speed
+
+        # Topology-only preprocessing; metrics are customized per cost snapshot.
+        self.contraction_hierarchy = (
+            ContractionHierarchy(self.road_graph, self._node_xy) if self.search_algorithm == "cch" else None
+        )
 
     def _nearest_node(self, lat: float, lon: float) -> int:
-        return min(
-            self.node_coords,
-            key=lambda n: _distance_km(lat, lon, self.node_coords[n][0], self.node_coords[n][1]),
+        return int(self.snap_nodes([(lat, lon)])[0])
+
+    def snap_nodes(self, coords: Any) -> np.ndarray:
+        """Nearest graph node id for each `(lat, lon)` pair, resolved with one KD-tree query."""
+        points = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        _, idx = self._node_tree.query(_project_km(points[:, 0], points[:, 1], self._ref_lat))
+        return np.asarray(idx, dtype=np.int64)
+
+    def _predicted_congestion(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        sim = self.simulation_engine
+        return self.prediction_engine.forecast(
+            sim.tick_count,
+            lambda: sim.feature_matrix(sim.current_time + timedelta(minutes=PREDICTION_HORIZON_MINUTES)),
+            horizon_minutes=PREDICTION_HORIZON_MINUTES,
+        )
+
+    def cost_snapshot(self) -> CostSnapshot:
+        """Travel-time vectors for the current tick, rebuilt in one vectorized pass when stale.
+
+        When the scheduler refreshes snapshots after each tick, the latest
+        swapped-in snapshot is served as is, so CCH customization never runs
+        on the request path.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and (self._refreshed_in_background or self._is_current(snapshot)):
+            return snapshot
+        return self._rebuild_snapshot()
+
+    def refresh_snapshot(self) -> CostSnapshot:
+        """Rebuild the snapshot for the latest tick off the request path; called by the scheduler."""
+        self._refreshed_in_background = True
+        return self._rebuild_snapshot()
+
+    def _is_current(self, snapshot: CostSnapshot) -> bool:
+        return snapshot.tick == self.simulation_engine.tick_count and snapshot.model_version == self.prediction_engine.model_version
+
+    def _rebuild_snapshot(self) -> CostSnapshot:
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is None or not self._is_current(snapshot):
+                # Swapped in whole: readers see either the old snapshot or the new one.
+                self._snapshot = snapshot = self._build_snapshot()
+            return snapshot
+
+    def _build_snapshot(self) -> CostSnapshot:
+        sim = self.simulation_engine
+        tick, model_version = sim.tick_count, self.prediction_engine.model_version
+        if self._snapshot is not None and tick < self._snapshot.tick:
+            # A simulation reset: tick numbers restart, so incident ticks and cached routes no longer apply.
+            self.route_cache.clear()
+        current = (sim.length_km / np.maximum(np.round(sim.avg_speed, 2), 5.0)) * 60.0
+        predicted_congestion, _, _ = self._predicted_congestion()
+        predicted = (sim.length_km / np.maximum(sim.free_flow_speed * (1 - predicted_congestion), 5.0)) * 60.0
+        snapshot = CostSnapshot(
+            tick=tick,
+            model_version=model_version,
+            current=current,
+            predicted=predicted,
+            congestion=np.round(sim.congestion_index, 4),
+            weights={"current": current.tolist(), "predicted": predicted.tolist()},
+            metrics=(
+                {
+                    "current": self.contraction_hierarchy.customize(current),
+                    "predicted": self.contraction_hierarchy.customize(predicted),
+                }
+                if self.contraction_hierarchy is not None
+                else {}
+            ),
+        )
+        return snapshot
+
+    def horizon_costs(self) -> HorizonCosts:
+        """Travel-time table over `TIME_DEPENDENT_HORIZONS`, rebuilt lazily once per tick."""
+        snapshot = self.cost_snapshot()
+        costs = self._horizon_costs
+        if costs is not None and costs.tick == snapshot.tick and costs.model_version == snapshot.model_version:
+            return costs
+
+        sim = self.simulation_engine
+        rows = [snapshot.current]
+        for horizon in TIME_DEPENDENT_HORIZONS[1:]:
+            predicted_congestion, _, _ = self.prediction_engine.forecast(
+                snapshot.tick,
+                lambda horizon=horizon: sim.feature_matrix(sim.current_time + timedelta(minutes=horizon)),
+                horizon_minutes=horizon,
+            )
+            rows.append((sim.length_km / np.maximum(sim.free_flow_speed * (1 - predicted_congestion), 5.0)) * 60.0)
+        table = np.vstack(rows)
+        gaps = np.diff(np.asarray(TIME_DEPENDENT_HORIZONS, dtype=np.float64))[:, None]
+        # Slopes below -1 would let a later departure arrive earlier; clamping
+        # keeps the interpolated costs FIFO so Dijkstra stays exact.
+        slope = np.vstack((np.maximum(np.diff(table, axis=0) / gaps, -1.0), np.zeros((1, table.shape[1]))))
+        costs = HorizonCosts(
+            tick=snapshot.tick,
+            model_version=snapshot.model_version,
+            horizons=TIME_DEPENDENT_HORIZONS,
+            table=table,
+            base=table.tolist(),
+            slope=slope.tolist(),
         )
+        self._horizon_costs = costs
+        return costs
 
     def _segment_cost(self, segment_id: int, mode: str = "current") -> float:
-        segment = self.simulation_engine.segment_by_id[segment_id]
-        state = self.simulation_engine.live_state[segment_id]
-
-        current_speed = max(float(state["avg_speed"]), 5.0)
-
-        if mode == "predicted":
-            history = list(self.simulation_engine.congestion_history[segment_id])
-            feature_guess = build_feature_row(
-                segment_id=segment_id,
-                timestamp=self.simulation_engine.current_time + timedelta(minutes=12),
-                congestion_history=history,
-                capacity=segment.capacity,
-                vehicle_count=state["vehicle_count"],
-                incident_flag=state["incident_flag"],
+        return self.cost_snapshot().weights[mode][self.simulation_engine.segment_index[segment_id]]
+
+    def _shortest_path(self, source: int, target: int, snapshot: CostSnapshot, mode: str) -> PathResult:
+        """Segment indices, cost and settled-node count using the configured search algorithm."""
+        if self.contraction_hierarchy is not None:
+            return self.contraction_hierarchy.query(snapshot.metrics[mode], source, target)
+        weights = snapshot.weights[mode]
+        if self.search_algorithm == "astar":
+            return astar(self.road_graph, weights, source, target, self._node_xy, self._minutes_per_km)
+        if self.search_algorithm == "bidirectional":
+            return bidirectional_dijkstra(self.road_graph, weights, source, target)
+        return dijkstra(self.road_graph, weights, source, target)
+
+    def _matrix_executor(self) -> ProcessPoolExecutor:
+        with self._matrix_pool_lock:
+            if self._matrix_pool is None:
+                self._matrix_pool = ProcessPoolExecutor(
+                    max_workers=min(self.matrix_workers, os.cpu_count() or 1),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_matrix_worker,
+                    initargs=(self.road_graph,),
+                )
+            return self._matrix_pool
+
+    def travel_time_matrix(
+        self, origins: list[tuple[float, float]], destinations: list[tuple[float, float]]
+    ) -> dict[str, Any]:
+        """Current and predicted travel minutes between every origin and destination, no geometry."""
+        sources = self.snap_nodes(origins).tolist()
+        targets = self.snap_nodes(destinations).tolist()
+        snapshot = self.cost_snapshot()
+        weights = {"current": snapshot.weights["current"], "predicted": snapshot.weights["predicted"]}
+
+        if self.matrix_workers > 0 and len(sources) > 1 and len(sources) * len(targets) >= self.matrix_parallel_pairs:
+            executor = self._matrix_executor()
+            chunk = -(-len(sources) // min(self.matrix_workers, len(sources)))
+            futures = [
+                executor.submit(_matrix_rows, sources[start : start + chunk], targets, weights)
+                for start in range(0, len(sources), chunk)
+            ]
+            rows: dict[str, list[list[float]]] = {mode: [] for mode in weights}
+            for future in futures:
+                for mode, mode_rows in future.result().items():
+                    rows[mode].extend(mode_rows)
+        else:
+            rows = _matrix_rows(sources, targets, weights, graph=self.road_graph)
+
+        return {
+            "tick": snapshot.tick,
+            "unit": "minutes",
+            **{
+                mode: [[round(cost, 2) if cost != math.inf else None for cost in row] for row in mode_rows]
+                for mode, mode_rows in rows.items()
+            },
+        }
+
+    def isochrone(self, origin: tuple[float, float], minutes: float, mode: str = "current") -> dict[str, Any]:
+        """Segments fully traversable from `origin` within `minutes` under `mode` weights."""
+        source = self._nearest_node(*origin)
+        snapshot = self.cost_snapshot()
+        key = (snapshot.tick, snapshot.model_version, source, float(minutes), mode)
+        with self._isochrone_lock:
+            cached = self._isochrones.get(key)
+            if cached is not None:
+                self._isochrones.move_to_end(key)
+                return cached
+
+        reached = bounded_one_to_all(self.road_graph, snapshot.weights[mode], source, minutes)
+        node_cost = np.full(self.road_graph.num_nodes, np.inf)
+        node_cost[np.fromiter(reached, dtype=np.int64, count=len(reached))] = np.fromiter(
+            reached.values(), dtype=np.float64, count=len(reached)
+        )
+        ends = self.road_graph.segment_nodes
+        weights = snapshot.current if mode == "current" else snapshot.predicted
+        # Entering from the cheaper end; the segment counts once its far end is reached.
+        arrival = np.minimum(node_cost[ends[:, 0]], node_cost[ends[:, 1]]) + weights
+        inside = np.flatnonzero(arrival <= minutes)
+        result = {
+            "tick": snapshot.tick,
+            "mode": mode,
+            "minutes": minutes,
+            "reachable_nodes": len(reached),
+            "segment_ids": self.simulation_engine.segment_ids[inside].tolist(),
+            "arrival_minutes": np.round(arrival[inside], 2).tolist(),
+        }
+
+        with self._isochrone_lock:
+            if self._isochrones and next(reversed(self._isochrones))[0] != snapshot.tick:
+                self._isochrones.clear()
+            self._isochrones[key] = result
+            while len(self._isochrones) > ISOCHRONE_CACHE_SIZE:
+                self._isochrones.popitem(last=False)
+        return result
+
+    def close(self) -> None:
+        with self._matrix_pool_lock:
+            if self._matrix_pool is not None:
+                self._matrix_pool.shutdown(cancel_futures=True)
+                self._matrix_pool = None
+
+    def _route_pair(self, source: int, target: int, snapshot: CostSnapshot) -> tuple[dict[str, PathResult], bool]:
+        """Current and predicted paths, served from the route cache when still valid."""
+        cached = self.route_cache.lookup((source, target), snapshot.weights)
+        if cached is not None:
+            # Costs are re-summed so cached routes still report this tick's times.
+            return {
+                mode: (segments, sum(snapshot.weights[mode][idx] for idx in segments), 0)
+                for mode, segments in cached.segments.items()
+            }, True
+
+        results = {mode: self._shortest_path(source, target, snapshot, mode) for mode in ("current", "predicted")}
+        if all(result[0] for result in results.values()):
+            self.route_cache.store(
+                (source, target),
+                CachedRoute(
+                    segments={mode: result[0] for mode, result in results.items()},
+                    costs={mode: result[1] for mode, result in results.items()},
+                ),
+                tick=snapshot.tick,
             )
-            predicted_congestion, _, _ = self.prediction_engine.predict(feature_guess)
-            current_speed = max(segment.free_flow_speed * (1 - predicted_congestion), 5.0)
-
-        return (segment.length_km / current_speed) * 60.0
-
-    def _shortest_path(self, source: int, target: int, mode: str) -> tuple[list[int], float]:
-        heap: list[tuple[float, int]] = [(0.0, source)]
-        best = {source: 0.0}
-        parent: dict[int, tuple[int, int]] = {}
-
-        while heap:
-            cost, node = heapq.heappop(heap)
-            if node == target:
-                break
-            if cost > best.get(node, float("inf")):
-                continue
-
-            for nxt, segment_id in self.graph.get(node, []):
-                nxt_cost = cost + self._segment_cost(segment_id, mode=mode)
-                if nxt_cost < best.get(nxt, float("inf")):
-                    best[nxt] = nxt_cost
-                    parent[nxt] = (node, segment_id)
-                    heapq.heappush(heap, (nxt_cost, nxt))
-
-        if target not in parent and source != target:
-            return [], float("inf")
-
-        segment_path = []
-        node_path = [target]
-        cur = target
-        while cur != source:
-            prev, seg = parent[cur]
-            node_path.append(prev)
-            segment_path.append(seg)
-            cur = prev
-        node_path.reverse()
-        segment_path.reverse()
-        return segment_path, best.get(target, 0.0)
-
-    def analyze_route(self, origin: tuple[float, float], destination: tuple[float, float]) -> dict[str, Any]:
+        return results, False
+
+    def analyze_route(
+        self,
+        origin: tuple[float, float],
+        destination: tuple[float, float],
+        time_dependent: bool = False,
+        alternatives: int = 0,
+    ) -> dict[str, Any]:
+        """With `time_dependent`, the predicted route prices each segment at its forecast for the arrival time.
+
+        `alternatives` adds up to that many via-node alternatives to the
+        predicted route, each at most `ALTERNATIVE_MAX_STRETCH` longer and
+        sharing at most `ALTERNATIVE_MAX_OVERLAP` of its time with the others.
+        The via-node search needs static weights, so the two options cannot
+        be combined: alternatives priced on the 12-minute forecast would not
+        be comparable with a route priced on arrival-time forecasts.
+        """
+        if time_dependent and alternatives > 0:
+            raise ValueError("alternatives are not available for time_dependent routes")
         source = self._nearest_node(*origin)
         target = self._nearest_node(*destination)
 
-        current_segments, current_time = self._shortest_path(source, target, mode="current")
-        predicted_segments, predicted_time = self._shortest_path(source, target, mode="predicted")
+        snapshot = self.cost_snapshot()
+        if time_dependent:
+            costs = self.horizon_costs()
+            results = {
+                "current": self._shortest_path(source, target, snapshot, "current"),
+                "predicted": time_dependent_dijkstra(
+                    self.road_graph, costs.horizons, costs.base, costs.slope, source, target
+                ),
+            }
+            cache_hit = False
+        else:
+            results, cache_hit = self._route_pair(source, target, snapshot)
+        current_segments, current_time, current_settled = results["current"]
+        predicted_segments, predicted_time, predicted_settled = results["predicted"]
 
         selected_segments = predicted_segments or current_segments
-        route_geometry = []
-        congestion_values = []
-
-        for segment_id in selected_segments:
-            segment = self.simulation_engine.segment_by_id[segment_id]
-            state = self.simulation_engine.live_state[segment_id]
-            route_geometry.append([[segment.start_lat, segment.start_lon], [segment.end_lat, segment.end_lon]])
-            congestion_values.append(float(state["congestion_index"]))
-
-        risk = sum(congestion_values) / len(congestion_values) if congestion_values else 0.0
-        return {
+        route_geometry, risk = self._describe(selected_segments, snapshot)
+        result = {
             "current_travel_time": round(current_time, 2),
             "predicted_travel_time": round(predicted_time, 2),
             "estimated_current_travel_time_min": round(current_time, 2),
             "predicted_travel_time_10_15_min": round(predicted_time, 2),
-            "prediction_horizon_minutes": 12,
+            "prediction_horizon_minutes": PREDICTION_HORIZON_MINUTES,
+            "time_dependent": time_dependent,
             "route_geometry": route_geometry,
             "congestion_risk_score": round(risk, 4),
+            "search": {
+                "algorithm": self.search_algorithm,
+                "settled_nodes": {"current": current_settled, "predicted": predicted_settled},
+                "cache_hit": cache_hit,
+            },
         }
+        if alternatives > 0:
+            result["alternatives"] = self._alternatives(source, target, snapshot, alternatives, predicted_segments)
+        return result
+
+    def _describe(self, segments: list[int], snapshot: CostSnapshot) -> tuple[list[list[list[float]]], float]:
+        route_geometry = []
+        congestion_values = []
+        for segment_idx in segments:
+            segment = self.simulation_engine.segments[segment_idx]
+            route_geometry.append([[segment.start_lat, segment.start_lon], [segment.end_lat, segment.end_lon]])
+            congestion_values.append(float(snapshot.congestion[segment_idx]))
+        risk = sum(congestion_values) / len(congestion_values) if congestion_values else 0.0
+        return route_geometry, risk
+
+    def _alternatives(
+        self, source: int, target: int, snapshot: CostSnapshot, count: int, primary: list[int]
+    ) -> list[dict[str, Any]]:
+        """Alternatives to the returned predicted route, which may come from the route cache.
+
+        `stretch` is relative to that route, so it is below 1 when the cached
+        route has drifted past a cheaper one.
+        """
+        routes, _ = via_node_alternatives(
+            self.road_graph,
+            snapshot.weights["predicted"],
+            source,
+            target,
+            count,
+            max_stretch=ALTERNATIVE_MAX_STRETCH,
+            max_overlap=ALTERNATIVE_MAX_OVERLAP,
+            primary=primary or None,
+        )
+        current_weights = snapshot.weights["current"]
+        described = []
+        for segments, predicted_time, _ in routes[1:]:
+            route_geometry, risk = self._describe(segments, snapshot)
+            current_time = sum(current_weights[idx] for idx in segments)
+            described.append(
+                {
+                    "current_travel_time": round(current_time, 2),
+                    "predicted_travel_time": round(predicted_time, 2),
+                    "stretch": round(predicted_time / routes[0][1], 4) if routes[0][1] > 0 else 1.0,
+                    "route_geometry": route_geometry,
+                    "congestion_risk_score": round(risk, 4),
+                }
+            )
+        return described
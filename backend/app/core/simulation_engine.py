@@ -1,13 +1,33 @@
 from __future__ import annotations
 
-from collections import defaultdict, deque
+from collections.abc import Callable, Iterator, Mapping
 from datetime import UTC, datetime, timedelta
 import random
 
-from app.core.congestion_model import compute_speed_and_congestion
+import numpy as np
+
+from app.core.congestion_model import compute_speed_and_congestion, compute_speed_and_congestion_batch
+from app.core.feature_engineering import BatchFeatureEngine
+from app.core.history_buffer import HistoryBuffer
 from app.ingestion.osm_loader import Segment, generate_synthetic_lagos_segments
 
 
+class LiveStateView(Mapping):
+    """Read-only `segment_id -> state dict` view over the engine's state arrays."""
+
+    def __init__(self, engine: SimulationEngine) -> None:
+        self._engine = engine
+
+    def __getitem__(self, segment_id: int) -> dict:
+        return self._engine._state_row(self._engine.segment_index[segment_id])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._engine.segment_index)
+
+    def __len__(self) -> int:
+        return len(self._engine.segment_index)
+
+
 class SimulationEngine:
     def __init__(
         self,
@@ -15,12 +35,41 @@ class SimulationEngine:
         total_vehicles: int = 120000,
         tick_interval_seconds: int = 1,
         seed: int = 42,
+        vectorized: bool = True,
+        history_window: int = 3600,
     ) -> None:
         random.seed(seed)
+        self.rng = np.random.default_rng(seed)
+        self.vectorized = vectorized
         self.tick_interval_seconds = tick_interval_seconds
         self.total_vehicles = total_vehicles
         self.segments: list[Segment] = generate_synthetic_lagos_segments(num_segments=num_segments, seed=seed)
         self.segment_by_id = {segment.id: segment for segment in self.segments}
+        self.segment_index = {segment.id: idx for idx, segment in enumerate(self.segments)}
+
+        # Struct-of-arrays state, aligned with `self.segments`.
+        self.segment_ids = np.array([s.id for s in self.segments], dtype=np.int64)
+        self.capacity = np.array([s.capacity for s in self.segments], dtype=np.int64)
+        self.free_flow_speed = np.array([s.free_flow_speed for s in self.segments], dtype=np.float64)
+        self.length_km = np.array([s.length_km for s in self.segments], dtype=np.float64)
+        self.vehicle_count = np.zeros(len(self.segments), dtype=np.int64)
+        self.avg_speed = np.zeros(len(self.segments), dtype=np.float64)
+        self.congestion_index = np.zeros(len(self.segments), dtype=np.float64)
+        self.incident_severity = np.zeros(len(self.segments), dtype=np.float64)
+        self.incident_flag = np.zeros(len(self.segments), dtype=np.int8)
+        self._static_rows = [
+            {
+                "length": segment.length_km,
+                "capacity": segment.capacity,
+                "free_flow_speed": segment.free_flow_speed,
+                "road_type": segment.road_type,
+                "geometry": [
+                    [segment.start_lat, segment.start_lon],
+                    [segment.end_lat, segment.end_lon],
+                ],
+            }
+            for segment in self.segments
+        ]
 
         self.paused = False
         self.demand_multiplier = 1.0
@@ -31,8 +80,11 @@ class SimulationEngine:
         self.current_time = datetime.now(UTC)
 
         self.incidents: dict[int, dict] = {}
-        self.live_state: dict[int, dict] = {}
-        self.congestion_history = defaultdict(lambda: deque(maxlen=3600))
+        # Called with the segment's index whenever an incident is injected.
+        self.incident_listeners: list[Callable[[int], None]] = []
+        self.live_state = LiveStateView(self)
+        self.congestion_history = HistoryBuffer(len(self.segments), window=history_window)
+        self.feature_engine = BatchFeatureEngine(self.congestion_history)
 
         self._initialize_state()
 
@@ -68,29 +120,31 @@ class SimulationEngine:
     def reset(self) -> None:
         self.tick_count = 0
         self.incidents.clear()
-        self.live_state.clear()
+        self.incident_severity.fill(0.0)
         self.congestion_history.clear()
         self._set_datetime_from_controls()
         self._initialize_state()
 
     def _initialize_state(self) -> None:
-        total_capacity = sum(s.capacity for s in self.segments)
-        for segment in self.segments:
-            initial_count = int(self.total_vehicles * (segment.capacity / max(total_capacity, 1)))
-            avg_speed, congestion_index = compute_speed_and_congestion(
-                vehicle_count=initial_count,
-                capacity=segment.capacity,
-                free_flow_speed=segment.free_flow_speed,
-            )
-            self.live_state[segment.id] = {
-                "segment_id": segment.id,
-                "timestamp": self.current_time.isoformat(),
-                "vehicle_count": initial_count,
-                "avg_speed": round(avg_speed, 2),
-                "congestion_index": round(congestion_index, 4),
-                "incident_flag": 0,
-            }
-            self.congestion_history[segment.id].append(congestion_index)
+        total_capacity = int(self.capacity.sum())
+        self.vehicle_count = (self.total_vehicles * (self.capacity / max(total_capacity, 1))).astype(np.int64)
+        self.avg_speed, self.congestion_index = compute_speed_and_congestion_batch(
+            vehicle_count=self.vehicle_count,
+            capacity=self.capacity,
+            free_flow_speed=self.free_flow_speed,
+        )
+        self.incident_flag.fill(0)
+        self.congestion_history.append(self.congestion_index)
+
+    def _state_row(self, idx: int) -> dict:
+        return {
+            "segment_id": int(self.segment_ids[idx]),
+            "timestamp": self.current_time.isoformat(),
+            "vehicle_count": int(self.vehicle_count[idx]),
+            "avg_speed": round(float(self.avg_speed[idx]), 2),
+            "congestion_index": round(float(self.congestion_index[idx]), 4),
+            "incident_flag": int(self.incident_flag[idx]),
+        }
 
     def set_paused(self, paused: bool) -> None:
         self.paused = paused
@@ -105,6 +159,10 @@ class SimulationEngine:
             "severity": max(0.0, min(1.0, severity)),
             "remaining": max(1, duration_ticks),
         }
+        idx = self.segment_index[segment_id]
+        self.incident_severity[idx] = self.incidents[segment_id]["severity"]
+        for listener in self.incident_listeners:
+            listener(idx)
         return True
 
     def _time_of_day_demand(self, timestamp: datetime) -> float:
@@ -126,13 +184,7 @@ class SimulationEngine:
         day_factor = 0.9 if self.day_of_week in {5, 6} else 1.0
         return max(0.45, time_factor * day_factor)
 
-    def _active_incident_severity(self, segment_id: int) -> float:
-        details = self.incidents.get(segment_id)
-        if not details:
-            return 0.0
-        return float(details["severity"])
-
-    def tick(self) -> dict[int, dict]:
+    def tick(self) -> Mapping[int, dict]:
         if self.paused:
             return self.live_state
 
@@ -140,42 +192,75 @@ class SimulationEngine:
         self.current_time += timedelta(seconds=self.tick_interval_seconds * self.simulation_speed_multiplier)
         demand_factor = self._time_of_day_demand(self.current_time) * self.demand_multiplier
 
-        for segment in self.segments:
-            prev = self.live_state[segment.id]
-            incident_severity = self._active_incident_severity(segment.id)
+        if self.vectorized:
+            self._tick_vectorized(demand_factor)
+        else:
+            self._tick_scalar(demand_factor)
+
+        self.congestion_history.append(self.congestion_index)
+
+        to_delete = []
+        for segment_id, details in self.incidents.items():
+            details["remaining"] -= 1
+            if details["remaining"] <= 0:
+                to_delete.append(segment_id)
+        for segment_id in to_delete:
+            self.incidents.pop(segment_id, None)
+            self.incident_severity[self.segment_index[segment_id]] = 0.0
+
+        return self.live_state
+
+    def _tick_vectorized(self, demand_factor: float) -> None:
+        size = len(self.segments)
+        effective_capacity = (self.capacity * (1 - 0.75 * self.incident_severity)).astype(np.int64)
+        effective_capacity = np.maximum(effective_capacity, 50)
+
+        stochastic_noise = self.rng.integers(-25, 26, size=size)
+        inflow = (demand_factor * self.capacity * self.rng.uniform(0.001, 0.006, size=size)).astype(np.int64)
+        outflow = (np.maximum(self.avg_speed, 5.0) * self.rng.uniform(0.03, 0.09, size=size)).astype(np.int64)
+
+        self.vehicle_count = np.maximum(self.vehicle_count + inflow - outflow + stochastic_noise, 0)
+        self.avg_speed, self.congestion_index = compute_speed_and_congestion_batch(
+            vehicle_count=self.vehicle_count,
+            capacity=effective_capacity,
+            free_flow_speed=self.free_flow_speed,
+        )
+        self.incident_flag = (self.incident_severity > 0).astype(np.int8)
+
+    def _tick_scalar(self, demand_factor: float) -> None:
+        for idx, segment in enumerate(self.segments):
+            incident_severity = float(self.incident_severity[idx])
             effective_capacity = int(segment.capacity * (1 - 0.75 * incident_severity))
             effective_capacity = max(effective_capacity, 50)
 
             stochastic_noise = random.randint(-25, 25)
             inflow = int(demand_factor * segment.capacity * random.uniform(0.001, 0.006))
-            outflow = int(max(prev["avg_speed"], 5.0) * random.uniform(0.03, 0.09))
+            outflow = int(max(float(self.avg_speed[idx]), 5.0) * random.uniform(0.03, 0.09))
 
-            next_vehicle_count = max(0, int(prev["vehicle_count"] + inflow - outflow + stochastic_noise))
+            next_vehicle_count = max(0, int(self.vehicle_count[idx] + inflow - outflow + stochastic_noise))
             avg_speed, congestion_index = compute_speed_and_congestion(
                 vehicle_count=next_vehicle_count,
                 capacity=effective_capacity,
                 free_flow_speed=segment.free_flow_speed,
             )
 
-            self.live_state[segment.id] = {
-                "segment_id": segment.id,
-                "timestamp": self.current_time.isoformat(),
-                "vehicle_count": next_vehicle_count,
-                "avg_speed": round(avg_speed, 2),
-                "congestion_index": round(congestion_index, 4),
-                "incident_flag": 1 if incident_severity > 0 else 0,
-            }
-            self.congestion_history[segment.id].append(congestion_index)
+            self.vehicle_count[idx] = next_vehicle_count
+            self.avg_speed[idx] = avg_speed
+            self.congestion_index[idx] = congestion_index
+            self.incident_flag[idx] = 1 if incident_severity > 0 else 0
 
-        to_delete = []
-        for segment_id, details in self.incidents.items():
-            details["remaining"] -= 1
-            if details["remaining"] <= 0:
-                to_delete.append(segment_id)
-        for segment_id in to_delete:
-            self.incidents.pop(segment_id, None)
+    def segment_history(self, segment_id: int, limit: int | None = None) -> np.ndarray:
+        """Zero-copy view of a segment's latest `limit` congestion samples, oldest first."""
+        return self.congestion_history.row(self.segment_index[segment_id], limit)
 
-        return self.live_state
+    def feature_matrix(self, timestamp: datetime | None = None) -> np.ndarray:
+        """`FEATURE_COLUMNS`-ordered feature matrix for every segment, aligned with `self.segments`."""
+        return self.feature_engine.matrix(
+            timestamp=timestamp or self.current_time,
+            vehicle_count=self.vehicle_count,
+            capacity=self.capacity,
+            incident_flag=self.incident_flag,
+        )
 
     def get_status(self) -> dict:
         return {
@@ -189,21 +274,30 @@ class SimulationEngine:
             "timestamp": self.current_time.isoformat(),
         }
 
+    def get_static_segments(self) -> list[dict]:
+        return [
+            {"segment_id": segment_id, **static}
+            for segment_id, static in zip(self.segment_ids.tolist(), self._static_rows)
+        ]
+
     def get_live_segments(self) -> list[dict]:
-        rows = []
-        for segment in self.segments:
-            state = self.live_state[segment.id]
-            rows.append(
-                {
-                    **state,
-                    "length": segment.length_km,
-                    "capacity": segment.capacity,
-                    "free_flow_speed": segment.free_flow_speed,
-                    "road_type": segment.road_type,
-                    "geometry": [
-                        [segment.start_lat, segment.start_lon],
-                        [segment.end_lat, segment.end_lon],
-                    ],
-                }
+        timestamp = self.current_time.isoformat()
+        return [
+            {
+                "segment_id": segment_id,
+                "timestamp": timestamp,
+                "vehicle_count": vehicle_count,
+                "avg_speed": avg_speed,
+                "congestion_index": congestion_index,
+                "incident_flag": incident_flag,
+                **static,
+            }
+            for segment_id, vehicle_count, avg_speed, congestion_index, incident_flag, static in zip(
+                self.segment_ids.tolist(),
+                self.vehicle_count.tolist(),
+                np.round(self.avg_speed, 2).tolist(),
+                np.round(self.congestion_index, 4).tolist(),
+                self.incident_flag.tolist(),
+                self._static_rows,
             )
-        return rows
+        ]
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class TrainingStore:
+    """Preallocated columnar ring buffer of training rows.
+
+    Holds one float32 column per feature plus `target`, `tick` and
+    `segment_id` columns. Rows are appended a whole tick at a time and the
+    oldest rows are overwritten once `max_rows` is reached, so the store is
+    always in tick order starting at the oldest row.
+    """
+
+    def __init__(self, max_rows: int, num_features: int) -> None:
+        if max_rows < 1:
+            raise ValueError("max_rows must be at least 1")
+        self.max_rows = int(max_rows)
+        self.features = np.zeros((self.max_rows, num_features), dtype=np.float32)
+        self.target = np.zeros(self.max_rows, dtype=np.float32)
+        self.tick = np.zeros(self.max_rows, dtype=np.int64)
+        self.segment_id = np.zeros(self.max_rows, dtype=np.int32)
+        # (start, size, rows appended so far), replaced as one tuple so readers
+        # on other threads see a consistent window.
+        self._window = (0, 0, 0)
+        # Rows appended so far plus any append in progress. Raised before a
+        # write touches the ring, so a reader can tell which of its rows may
+        # have been overwritten while it copied.
+        self._reserved = 0
+
+    def __len__(self) -> int:
+        return self._window[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.features.nbytes + self.target.nbytes + self.tick.nbytes + self.segment_id.nbytes
+
+    def append_block(self, features: np.ndarray, target: np.ndarray, tick: int, segment_ids: np.ndarray) -> None:
+        """Append one tick of rows; `features` is `(rows, num_features)`."""
+        count = len(target)
+        if count == 0:
+            return
+        if count > self.max_rows:
+            features = features[-self.max_rows :]
+            target = target[-self.max_rows :]
+            segment_ids = segment_ids[-self.max_rows :]
+            count = self.max_rows
+
+        start, size, appended = self._window
+        self._reserved = appended + count
+        write = (start + size) % self.max_rows
+        first = min(count, self.max_rows - write)
+        for lo, hi, src in ((write, write + first, slice(0, first)), (0, count - first, slice(first, count))):
+            if hi <= lo:
+                continue
+            self.features[lo:hi] = features[src]
+            self.target[lo:hi] = target[src]
+            self.tick[lo:hi] = tick
+            self.segment_id[lo:hi] = segment_ids[src]
+
+        overflow = max(0, size + count - self.max_rows)
+        self._window = ((start + overflow) % self.max_rows, min(size + count, self.max_rows), appended + count)
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """Tick-ordered copies of the `features`, `target`, `tick` and `segment_id` columns.
+
+        Training reads these on a worker thread while the scheduler keeps
+        appending, and appends overwrite the oldest rows once the ring is
+        full. Each column is copied out of the window as it stood when the
+        call started, then the oldest rows any append may have overwritten
+        during the copy are dropped, so every returned row is whole.
+        """
+        start, size, appended = self._window
+        end = start + size
+        if end <= self.max_rows:
+            parts = (slice(start, end),)
+        else:
+            parts = (slice(start, self.max_rows), slice(0, end - self.max_rows))
+
+        columns = {}
+        for name in ("features", "target", "tick", "segment_id"):
+            array = getattr(self, name)
+            columns[name] = array[parts[0]].copy() if len(parts) == 1 else np.concatenate([array[part] for part in parts])
+
+        # Appends overwrite the window's oldest rows first.
+        overwritten = min(size, max(0, size + self._reserved - appended - self.max_rows))
+        if overwritten:
+            columns = {name: column[overwritten:] for name, column in columns.items()}
+        return columns
+
+    def clear(self) -> None:
+        # Counted as overwriting every row, since later appends restart at the front of the ring.
+        appended = self._window[2] + self.max_rows
+        self._reserved = appended
+        self._window = (0, 0, appended)
@@ -6,11 +6,13 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 from app.api.heatmap import router as heatmap_router
+from app.api.network import router as network_router
 from app.api.prediction import router as prediction_router
 from app.api.routing import router as routing_router
 from app.core.prediction_engine import PredictionEngine
 from app.core.routing_engine import RoutingEngine
 from app.core.simulation_engine import SimulationEngine
+from app.services.compression import CompressedBodies
 from app.services.scheduler import SimulationScheduler
 from app.services.state_cache import StateCache
 
@@ -20,22 +22,65 @@ async def lifespan(app: FastAPI):
     num_segments = int(os.getenv("SIM_NUM_SEGMENTS", "1200"))
     total_vehicles = int(os.getenv("SIM_TOTAL_VEHICLES", "120000"))
     tick_interval_seconds = int(os.getenv("SIM_TICK_INTERVAL_SECONDS", "1"))
+    vectorized = os.getenv("SIM_VECTORIZED", "1") != "0"
+    history_window = int(os.getenv("SIM_HISTORY_WINDOW", "3600"))
+    prediction_max_rows = int(os.getenv("PREDICTION_MAX_ROWS", "2000000"))
+    training_workers = int(os.getenv("PREDICTION_TRAINING_WORKERS", "3"))
+    candidate_budget_seconds = float(os.getenv("PREDICTION_CANDIDATE_BUDGET_SECONDS", "60"))
+    candidate_max_rows = int(os.getenv("PREDICTION_CANDIDATE_MAX_ROWS", "250000"))
+    learning_mode = os.getenv("PREDICTION_LEARNING_MODE", "batch")
+    inference_backend = os.getenv("PREDICTION_INFERENCE_BACKEND", "compiled")
+    search_algorithm = os.getenv("ROUTING_SEARCH_ALGORITHM", "astar")
+    route_cache_size = int(os.getenv("ROUTING_CACHE_SIZE", "1024"))
+    route_cache_tolerance = float(os.getenv("ROUTING_CACHE_TOLERANCE", "0.05"))
+    matrix_workers = int(os.getenv("ROUTING_MATRIX_WORKERS", "2"))
+    delta_epsilon = float(os.getenv("LIVE_DELTA_EPSILON", "0.005"))
+    delta_history_ticks = int(os.getenv("LIVE_DELTA_HISTORY_TICKS", "600"))
+    stream_queue_size = int(os.getenv("LIVE_STREAM_QUEUE_SIZE", "8"))
+    compress_min_bytes = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "1024"))
+    compressed_cache_size = int(os.getenv("HTTP_COMPRESSED_CACHE_SIZE", "32"))
+    redis_max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", "16"))
 
     simulation_engine = SimulationEngine(
         num_segments=num_segments,
         total_vehicles=total_vehicles,
         tick_interval_seconds=tick_interval_seconds,
+        vectorized=vectorized,
+        history_window=history_window,
+    )
+    prediction_engine = PredictionEngine(
+        max_rows=prediction_max_rows,
+        training_workers=training_workers,
+        candidate_budget_seconds=candidate_budget_seconds,
+        candidate_max_rows=candidate_max_rows,
+        learning_mode=learning_mode,
+        inference_backend=inference_backend,
+    )
+    state_cache = StateCache(max_connections=redis_max_connections)
+    routing_engine = RoutingEngine(
+        simulation_engine,
+        prediction_engine,
+        search_algorithm=search_algorithm,
+        route_cache_size=route_cache_size,
+        route_cache_tolerance=route_cache_tolerance,
+        matrix_workers=matrix_workers,
+    )
+    scheduler = SimulationScheduler(
+        simulation_engine,
+        prediction_engine,
+        state_cache,
+        delta_epsilon=delta_epsilon,
+        delta_history_ticks=delta_history_ticks,
+        stream_queue_size=stream_queue_size,
+        routing_engine=routing_engine,
     )
-    prediction_engine = PredictionEngine()
-    state_cache = StateCache()
-    routing_engine = RoutingEngine(simulation_engine, prediction_engine)
-    scheduler = SimulationScheduler(simulation_engine, prediction_engine, state_cache)
 
     app.state.simulation_engine = simulation_engine
     app.state.prediction_engine = prediction_engine
     app.state.state_cache = state_cache
     app.state.routing_engine = routing_engine
     app.state.scheduler = scheduler
+    app.state.compressed_bodies = CompressedBodies(min_size=compress_min_bytes, max_entries=compressed_cache_size)
 
     state_cache.set_json(
         "sim_control_state",
@@ -48,6 +93,8 @@ async def lifespan(app: FastAPI):
     await scheduler.start()
     yield
     await scheduler.stop()
+    routing_engine.close()
+    await state_cache.aclose()
 
 
 app = FastAPI(
@@ -57,6 +104,7 @@ app = FastAPI(
 )
 
 app.include_router(heatmap_router)
+app.include_router(network_router)
 app.include_router(routing_router)
 app.include_router(prediction_router)
 
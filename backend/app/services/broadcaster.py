@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+
+
+# (event type, encoded frame)
+Frame = tuple[str, bytes]
+
+
+class Subscription:
+    def __init__(self, queue_size: int) -> None:
+        self.queue: asyncio.Queue[Frame] = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+
+class Broadcaster:
+    """Fans each tick's pre-encoded frame out to every stream subscriber.
+
+    Every subscriber has a bounded queue. When a slow consumer's queue is
+    full, its backlog is discarded and replaced by one snapshot frame of the
+    latest state, so it skips straight to the present instead of replaying
+    stale deltas. Each frame is encoded at most once per tick and only if
+    a subscriber needs it. Everything runs on the event loop.
+    """
+
+    def __init__(self, queue_size: int = 8) -> None:
+        self.queue_size = queue_size
+        self._subscribers: set[Subscription] = set()
+        self._snapshot: Frame | None = None
+        self._snapshot_factory: Callable[[], Frame] | None = None
+        self.published = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def _latest_snapshot(self) -> Frame | None:
+        if self._snapshot is None and self._snapshot_factory is not None:
+            self._snapshot = self._snapshot_factory()
+        return self._snapshot
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        snapshot = self._latest_snapshot()
+        if snapshot is not None:
+            subscription.queue.put_nowait(snapshot)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, delta_factory: Callable[[], Frame], snapshot_factory: Callable[[], Frame]) -> None:
+        """Queue this tick's delta frame for every subscriber; both frames are built only when needed."""
+        self._snapshot = None
+        self._snapshot_factory = snapshot_factory
+        self.published += 1
+        frame = None
+        for subscription in self._subscribers:
+            queue = subscription.queue
+            if queue.full():
+                subscription.dropped += queue.qsize()
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._latest_snapshot())
+            else:
+                if frame is None:
+                    frame = delta_factory()
+                queue.put_nowait(frame)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "subscribers": len(self._subscribers),
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "dropped": sum(subscription.dropped for subscription in self._subscribers),
+        }
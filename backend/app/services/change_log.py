@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from collections import deque
+import time
+
+import numpy as np
+
+
+class ChangeLog:
+    """Per-tick record of which rows moved by more than `epsilon`.
+
+    Each row is compared with the values it had when it was last reported
+    as changed, not with the previous tick, so slow drift still surfaces
+    once it adds up to `epsilon`. Only the last `max_ticks` ticks are kept;
+    older `since_tick` values cannot be answered and callers fall back to a
+    full snapshot.
+
+    Tick numbers restart after a simulation reset, so a delta cursor is the
+    pair `(epoch, tick)`: `epoch` changes whenever the log is cleared, and a
+    cursor from an earlier epoch always gets a full snapshot.
+    """
+
+    def __init__(self, epsilon: float = 0.005, max_ticks: int = 600) -> None:
+        self.epsilon = epsilon
+        self._reference: np.ndarray | None = None
+        self._ticks: deque[tuple[int, np.ndarray]] = deque(maxlen=max_ticks)
+        # Millisecond-based, so epochs also differ across process restarts.
+        self.epoch = time.time_ns() // 1_000_000
+
+    def clear(self) -> None:
+        """Forget every logged tick, e.g. on a simulation reset; the next `record` reports every row."""
+        self._reference = None
+        self._ticks.clear()
+        self.epoch = max(self.epoch + 1, time.time_ns() // 1_000_000)
+
+    def record(self, tick: int, values: np.ndarray) -> np.ndarray:
+        """Log the rows of `values` (rows x columns) that changed at `tick` and return their indices."""
+        reference = self._reference
+        last_tick = self._ticks[-1][0] if self._ticks else None
+        if reference is not None and reference.shape == values.shape and tick == last_tick:
+            # A paused simulation republishes the same tick; it is already logged.
+            return np.zeros(0, dtype=np.int64)
+        if reference is None or reference.shape != values.shape or (last_tick is not None and tick < last_tick):
+            # First tick, a resized network or a simulation reset: everything changed.
+            if reference is not None:
+                self.clear()
+            self._reference = values.copy()
+            changed = np.arange(len(values))
+        else:
+            changed = np.flatnonzero((np.abs(values - reference) > self.epsilon).any(axis=1))
+            reference[changed] = values[changed]
+        self._ticks.append((tick, changed))
+        return changed
+
+    def changed_since(self, since_tick: int, until_tick: int, epoch: int | None = None) -> np.ndarray | None:
+        """Rows changed in `(since_tick, until_tick]`, or None when the log no longer covers it.
+
+        Pass the `epoch` the client's `since_tick` came from; without it a
+        tick from before a reset cannot be told apart from one after it.
+        """
+        if epoch is not None and epoch != self.epoch:
+            return None
+        if since_tick > until_tick:
+            # The client is ahead of us, so the simulation was reset since it last polled.
+            return None
+        if since_tick == until_tick:
+            return np.zeros(0, dtype=np.int64)
+        # Copy first: API threads read while the scheduler appends.
+        entries = list(self._ticks)
+        if not entries or entries[0][0] > since_tick + 1 or entries[-1][0] < until_tick:
+            return None
+        parts = [changed for tick, changed in entries if since_tick < tick <= until_tick]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts))
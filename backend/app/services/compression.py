@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+import gzip
+import threading
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only with brotli installed
+    brotli = None
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """The content coding to use for an `Accept-Encoding` header: `br`, `gzip` or None for identity."""
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressedBodies:
+    """Bounded LRU of compressed response bodies keyed on `(etag, coding)`.
+
+    Responses are keyed by a validator that changes whenever their content
+    does, so each tick's body is compressed once per coding no matter how
+    many clients poll it. Bodies under `min_size` bytes are sent as is.
+    """
+
+    def __init__(self, min_size: int = 1024, max_entries: int = 32, gzip_level: int = 6, brotli_quality: int = 5) -> None:
+        self.min_size = min_size
+        self.max_entries = max_entries
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[Hashable, str], bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _compress(self, body: bytes, coding: str) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def encode(self, etag: Hashable, build: Callable[[], bytes], accept_encoding: str | None) -> tuple[bytes, str | None]:
+        """`(content, coding)` for the body `build` returns; `build` is skipped on a cache hit."""
+        coding = negotiate(accept_encoding)
+        if coding is None:
+            return build(), None
+        key = (etag, coding)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compressed, coding
+        body = build()
+        if len(body) < self.min_size:
+            return body, None
+        compressed = self._compress(body, coding)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = compressed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compressed, coding
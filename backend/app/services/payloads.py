@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
+from typing import Any
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+
+# Versioned cache keys: bump the suffix whenever the stored byte layout changes.
+LIVE_ROWS_KEY = "live_rows:v1"
+LIVE_DYNAMIC_ROWS_KEY = "live_dynamic_rows:v1"
+SIM_STATUS_KEY = "sim_status:v1"
+MODEL_METRICS_KEY = "model_metrics:v1"
+
+_HEADER = struct.Struct("<qqdq")
+_VERSION = struct.Struct("<q")
+
+
+def encode(value: Any) -> bytes:
+    """Compact JSON bytes, via orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def encode_versioned(version: int, value: Any) -> bytes:
+    """`value` as JSON behind an int64 version, so readers can validate without decoding."""
+    return _VERSION.pack(version) + encode(value)
+
+
+def decode_versioned(blob: bytes) -> tuple[int, bytes]:
+    return _VERSION.unpack_from(blob)[0], blob[_VERSION.size :]
+
+
+def encode_rows(rows: list[dict], tick: int, model_version: int, published_at: float) -> bytes:
+    """Pack per-row JSON with a row-offset index so readers can slice rows without decoding."""
+    return pack_rows([encode(row) for row in rows], tick, model_version, published_at)
+
+
+def pack_rows(encoded: list[bytes], tick: int, model_version: int, published_at: float) -> bytes:
+    """`encode_rows` for rows that are already JSON objects.
+
+    Layout: header `(tick, model_version, published_at, count)`, then
+    `count + 1` int64 byte offsets, then each row's JSON followed by a comma.
+    """
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(row) + 1 for row in encoded], out=offsets[1:])
+    body = b"".join(row + b"," for row in encoded)
+    return _HEADER.pack(tick, model_version, published_at, len(encoded)) + offsets.tobytes() + body
+
+
+def merge_rows(encoded: list[bytes], fragments: list[bytes]) -> list[bytes]:
+    """Append each pre-encoded `"key":value` fragment to the matching JSON object."""
+    return [row[:-1] + b"," + fragment + b"}" for row, fragment in zip(encoded, fragments)]
+
+
+class StaticNetwork:
+    """The network's fixed per-segment fields, encoded once at startup.
+
+    `body` is the `/network/segments` response and `etag` its strong ETag;
+    `fragments` holds each row without its `segment_id` and without braces,
+    ready to be merged into the per-tick rows.
+    """
+
+    def __init__(self, rows: list[dict]) -> None:
+        self.fragments = [encode({key: value for key, value in row.items() if key != "segment_id"})[1:-1] for row in rows]
+        self.body = b'{"count":%d,"items":%s}' % (len(rows), encode(rows))
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an `If-None-Match` header matches `etag` (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+class EncodedRows:
+    """Read-only view over an `encode_rows` blob."""
+
+    def __init__(self, blob: bytes) -> None:
+        self.tick, self.model_version, self.published_at, self.count = _HEADER.unpack_from(blob)
+        start = _HEADER.size
+        self.offsets = np.frombuffer(blob, dtype=np.int64, count=self.count + 1, offset=start)
+        self._body = memoryview(blob)[start + self.offsets.nbytes :]
+
+    def array(self, limit: int | None = None) -> bytes:
+        """JSON array of the first `limit` rows (all rows when None)."""
+        count = self.count if limit is None else min(limit, self.count)
+        if count == 0:
+            return b"[]"
+        return b"[" + self._body[: int(self.offsets[count]) - 1] + b"]"
+
+    def select(self, indices: Any) -> bytes:
+        """JSON array of the rows at `indices`, in the given order."""
+        offsets, body = self.offsets.tolist(), self._body
+        return b"[" + b",".join(body[offsets[idx] : offsets[idx + 1] - 1] for idx in indices) + b"]"
+
+
+def live_body(
+    rows: EncodedRows | None,
+    status: bytes | None,
+    limit: int | None = None,
+    indices: Any = None,
+    meta: dict[str, Any] | None = None,
+) -> bytes:
+    """`{"count", "items", "status", **meta}` response body assembled from pre-encoded parts.
+
+    `items` holds the rows at `indices` when given, otherwise the first
+    `limit` rows; `count` is the number of rows in `items` for a selection
+    and the network size otherwise.
+    """
+    if rows is None:
+        count, items = 0, b"[]"
+    elif indices is not None:
+        count, items = len(indices), rows.select(indices)
+    else:
+        count, items = rows.count, rows.array(limit)
+    extra = b"," + encode(meta)[1:-1] if meta else b""
+    return b'{"count":%d,"items":%s,"status":%s%s}' % (count, items, status or b"{}", extra)
@@ -1,29 +1,69 @@
 from __future__ import annotations
 
 import asyncio
+import time
 
-from app.core.feature_engineering import build_feature_row
+import numpy as np
+
+from app.services.broadcaster import Broadcaster
+from app.services.change_log import ChangeLog
+from app.services.payloads import (
+    LIVE_DYNAMIC_ROWS_KEY,
+    LIVE_ROWS_KEY,
+    MODEL_METRICS_KEY,
+    SIM_STATUS_KEY,
+    EncodedRows,
+    StaticNetwork,
+    encode,
+    encode_versioned,
+    live_body,
+    merge_rows,
+    pack_rows,
+)
 
 
 class SimulationScheduler:
-    def __init__(self, simulation_engine, prediction_engine, state_cache) -> None:
+    def __init__(
+        self,
+        simulation_engine,
+        prediction_engine,
+        state_cache,
+        delta_epsilon: float = 0.005,
+        delta_history_ticks: int = 600,
+        stream_queue_size: int = 8,
+        routing_engine=None,
+    ) -> None:
         self.simulation_engine = simulation_engine
         self.prediction_engine = prediction_engine
         self.state_cache = state_cache
+        # When set, its cost snapshot (and CCH metrics) is rebuilt after each tick, off the request path.
+        self.routing_engine = routing_engine
+        # Geometry and road attributes never change: encoded once, merged into full rows per tick.
+        self.static_network = StaticNetwork(simulation_engine.get_static_segments())
+        # Rows whose congestion-scale values moved, per tick, for `?since_tick=` deltas.
+        self.change_log = ChangeLog(epsilon=delta_epsilon, max_ticks=delta_history_ticks)
+        # Subscribers of /live/stream; each tick is encoded once and shared by all of them.
+        self.broadcaster = Broadcaster(queue_size=stream_queue_size)
         self._task = None
         self._retrain_task = None
+        self._routing_task = None
         self._running = False
         self._last_reset_token = None
+        # Tick and small payloads last written, so a paused loop republishes nothing.
+        self._published_tick = None
+        self._published: dict[str, bytes] = {}
 
-    def _sync_shared_controls(self) -> None:
-        remote = self.state_cache.get_json("sim_control_state", None)
+    async def _sync_shared_controls(self) -> None:
+        remote = await self.state_cache.aget_json("sim_control_state", None)
         if not isinstance(remote, dict):
             return
 
         reset_token = remote.get("reset_token")
         if reset_token and reset_token != self._last_reset_token:
             self.simulation_engine.reset()
+            self.change_log.clear()
             self._last_reset_token = reset_token
+            self._published_tick = None
 
         self.simulation_engine.set_paused(bool(remote.get("paused", self.simulation_engine.paused)))
         self.simulation_engine.set_demand_scenario(float(remote.get("demand_multiplier", self.simulation_engine.demand_multiplier)))
@@ -34,6 +74,27 @@ class SimulationScheduler:
             speed_multiplier=float(remote.get("simulation_speed_multiplier", self.simulation_engine.simulation_speed_multiplier)),
         )
 
+    def _publish(self, rows: EncodedRows, status: bytes, changed: np.ndarray) -> None:
+        tick, epoch = rows.tick, self.change_log.epoch
+        self.broadcaster.publish(
+            lambda: ("delta", live_body(rows, status, indices=changed, meta={"type": "delta", "tick": tick, "epoch": epoch})),
+            lambda: ("snapshot", live_body(rows, status, meta={"type": "snapshot", "tick": tick, "epoch": epoch})),
+        )
+
+    def _status_payloads(self) -> dict[str, bytes]:
+        sim, prediction_engine = self.simulation_engine, self.prediction_engine
+        return {
+            SIM_STATUS_KEY: encode({**sim.get_status(), "model": prediction_engine.model_name}),
+            MODEL_METRICS_KEY: encode_versioned(prediction_engine.model_version, prediction_engine.metrics),
+        }
+
+    async def _refresh_status(self) -> None:
+        """Write status and metrics only if they changed, e.g. controls or a retrain while paused."""
+        changed = {key: value for key, value in self._status_payloads().items() if self._published.get(key) != value}
+        if changed:
+            await self.state_cache.aset_many(changed)
+            self._published.update(changed)
+
     async def start(self) -> None:
         if self._running:
             return
@@ -42,12 +103,13 @@ class SimulationScheduler:
 
     async def stop(self) -> None:
         self._running = False
-        if self._retrain_task and not self._retrain_task.done():
-            self._retrain_task.cancel()
-            try:
-                await self._retrain_task
-            except asyncio.CancelledError:
-                pass
+        for task in (self._retrain_task, self._routing_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
         if self._task:
             self._task.cancel()
             try:
@@ -58,65 +120,101 @@ class SimulationScheduler:
     async def _loop(self) -> None:
         while self._running:
             await asyncio.sleep(0)
-            self._sync_shared_controls()
+            await self._sync_shared_controls()
             self.simulation_engine.tick()
-            live_segments = self.simulation_engine.get_live_segments()
-
-            feature_rows = []
-            for idx, row in enumerate(live_segments, start=1):
-                history = list(self.simulation_engine.congestion_history[row["segment_id"]])
-                features = build_feature_row(
-                    segment_id=row["segment_id"],
-                    timestamp=self.simulation_engine.current_time,
-                    congestion_history=history,
-                    capacity=row["capacity"],
-                    vehicle_count=row["vehicle_count"],
-                    incident_flag=row["incident_flag"],
-                )
-                feature_rows.append(features)
-                self.prediction_engine.add_observation(
-                    features=features,
-                    target=row["congestion_index"],
-                    tick=self.simulation_engine.tick_count,
-                )
-                if idx % 200 == 0:
-                    await asyncio.sleep(0)
+            if self.simulation_engine.tick_count == self._published_tick:
+                # Paused: rows, forecasts and the change log are exactly as last published.
+                await self._refresh_status()
+                await asyncio.sleep(self.simulation_engine.tick_interval_seconds)
+                continue
+
+            feature_matrix = self.simulation_engine.feature_matrix()
+            self.prediction_engine.add_observations(
+                feature_matrix,
+                targets=np.round(self.simulation_engine.congestion_index, 4),
+                segment_ids=self.simulation_engine.segment_ids,
+                tick=self.simulation_engine.tick_count,
+            )
+            await asyncio.sleep(0)
 
             if (
-                len(self.prediction_engine.rows) >= 500
+                self.prediction_engine.learning_mode == "batch"
+                and len(self.prediction_engine.rows) >= 500
                 and self.simulation_engine.tick_count % self.prediction_engine.retrain_interval_ticks == 0
                 and (self._retrain_task is None or self._retrain_task.done())
             ):
                 self._retrain_task = asyncio.create_task(asyncio.to_thread(self.prediction_engine.train))
 
-            heatmap_rows = []
-            for idx, (row, features) in enumerate(zip(live_segments, feature_rows), start=1):
-                predicted, lower, upper = self.prediction_engine.predict(features)
-                predicted_speed = max(float(row["free_flow_speed"]) * (1 - predicted), 5.0)
-                estimated_travel_time_min = (float(row["length"]) / max(float(row["avg_speed"]), 5.0)) * 60.0
-                predicted_travel_time_min = (float(row["length"]) / predicted_speed) * 60.0
-                heatmap_rows.append(
+            sim = self.simulation_engine
+            predicted, lower, upper = self.prediction_engine.forecast(sim.tick_count, lambda: feature_matrix)
+            predicted_speed = np.maximum(sim.free_flow_speed * (1 - predicted), 5.0)
+            estimated_travel_time_min = (sim.length_km / np.maximum(np.round(sim.avg_speed, 2), 5.0)) * 60.0
+            predicted_travel_time_min = (sim.length_km / predicted_speed) * 60.0
+
+            timestamp = sim.current_time.isoformat()
+            dynamic_rows = [
+                encode(
                     {
-                        **row,
-                        "predicted_congestion": round(predicted, 4),
-                        "confidence_lower": round(lower, 4),
-                        "confidence_upper": round(upper, 4),
-                        "estimated_segment_travel_time_min": round(estimated_travel_time_min, 3),
-                        "predicted_segment_travel_time_min": round(predicted_travel_time_min, 3),
+                        "segment_id": segment_id,
+                        "timestamp": timestamp,
+                        "vehicle_count": vehicle_count,
+                        "avg_speed": avg_speed,
+                        "congestion_index": congestion_index,
+                        "incident_flag": incident_flag,
+                        "predicted_congestion": row_predicted,
+                        "confidence_lower": row_lower,
+                        "confidence_upper": row_upper,
+                        "estimated_segment_travel_time_min": row_estimated,
+                        "predicted_segment_travel_time_min": row_predicted_time,
                     }
                 )
-                if idx % 200 == 0:
-                    await asyncio.sleep(0)
-
-            self.state_cache.set_json("live_segments", heatmap_rows)
-            self.state_cache.set_json("live_heatmap", heatmap_rows)
-            self.state_cache.set_json("model_metrics", self.prediction_engine.metrics)
-            self.state_cache.set_json(
-                "sim_status",
+                for (
+                    segment_id,
+                    vehicle_count,
+                    avg_speed,
+                    congestion_index,
+                    incident_flag,
+                    row_predicted,
+                    row_lower,
+                    row_upper,
+                    row_estimated,
+                    row_predicted_time,
+                ) in zip(
+                    sim.segment_ids.tolist(),
+                    sim.vehicle_count.tolist(),
+                    np.round(sim.avg_speed, 2).tolist(),
+                    np.round(sim.congestion_index, 4).tolist(),
+                    sim.incident_flag.tolist(),
+                    np.round(predicted, 4).tolist(),
+                    np.round(lower, 4).tolist(),
+                    np.round(upper, 4).tolist(),
+                    np.round(estimated_travel_time_min, 3).tolist(),
+                    np.round(predicted_travel_time_min, 3).tolist(),
+                )
+            ]
+            await asyncio.sleep(0)
+
+            # Speeds, counts and travel times follow from these columns, all on a 0-1 scale.
+            changed = self.change_log.record(
+                sim.tick_count,
+                np.column_stack((sim.congestion_index, predicted, lower, upper, sim.incident_flag)),
+            )
+            # Encoded once; /live/segments and /live/heatmap serve these bytes directly.
+            header = (sim.tick_count, self.prediction_engine.model_version, time.time())
+            rows_blob = pack_rows(merge_rows(dynamic_rows, self.static_network.fragments), *header)
+            status_payloads = self._status_payloads()
+            # One pipelined transaction per tick instead of a round trip per key.
+            await self.state_cache.aset_many(
                 {
-                    **self.simulation_engine.get_status(),
-                    "model": self.prediction_engine.model_name,
-                },
+                    LIVE_ROWS_KEY: rows_blob,
+                    LIVE_DYNAMIC_ROWS_KEY: pack_rows(dynamic_rows, *header),
+                    **status_payloads,
+                }
             )
+            self._published_tick = sim.tick_count
+            self._published = status_payloads
+            self._publish(EncodedRows(rows_blob), status_payloads[SIM_STATUS_KEY], changed)
+            if self.routing_engine is not None and (self._routing_task is None or self._routing_task.done()):
+                self._routing_task = asyncio.create_task(asyncio.to_thread(self.routing_engine.refresh_snapshot))
 
             await asyncio.sleep(self.simulation_engine.tick_interval_seconds)
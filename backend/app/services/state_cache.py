@@ -6,25 +6,40 @@ from typing import Any
 
 
 class StateCache:
-    """Redis-first cache with in-memory fallback."""
+    """Redis-first cache with in-memory fallback.
 
-    def __init__(self) -> None:
+    The blocking methods serve threadpool endpoints; the `a*` methods go
+    through a pooled asyncio client and are the ones to use on the event loop.
+    """
+
+    def __init__(self, max_connections: int = 16) -> None:
         self._memory: dict[str, Any] = {}
         self._redis = None
+        self._aredis = None
         redis_url = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
 
         try:
             import redis
+            import redis.asyncio
 
             self._redis = redis.Redis.from_url(
                 redis_url,
-                decode_responses=True,
+                decode_responses=False,
                 socket_connect_timeout=0.2,
                 socket_timeout=0.2,
             )
             self._redis.ping()
+            self._aredis = redis.asyncio.Redis(
+                connection_pool=redis.asyncio.ConnectionPool.from_url(
+                    redis_url,
+                    max_connections=max_connections,
+                    socket_connect_timeout=0.2,
+                    socket_timeout=0.2,
+                )
+            )
         except Exception:
             self._redis = None
+            self._aredis = None
 
     def set_json(self, key: str, value: Any) -> None:
         if self._redis:
@@ -37,3 +52,43 @@ class StateCache:
             raw = self._redis.get(key)
             return json.loads(raw) if raw else default
         return self._memory.get(key, default)
+
+    def set_bytes(self, key: str, value: bytes) -> None:
+        """Store an already-encoded payload as is."""
+        if self._redis:
+            self._redis.set(key, value)
+            return
+        self._memory[key] = value
+
+    def get_bytes(self, key: str) -> bytes | None:
+        if self._redis:
+            return self._redis.get(key)
+        return self._memory.get(key)
+
+    async def aget_json(self, key: str, default: Any = None) -> Any:
+        if self._aredis:
+            raw = await self._aredis.get(key)
+            return json.loads(raw) if raw else default
+        return self._memory.get(key, default)
+
+    async def aget_many(self, keys: list[str]) -> list[bytes | None]:
+        """Several already-encoded payloads in one round trip."""
+        if self._aredis:
+            return await self._aredis.mget(keys)
+        return [self._memory.get(key) for key in keys]
+
+    async def aset_many(self, values: dict[str, bytes]) -> None:
+        """Store already-encoded payloads in one MULTI/EXEC, so readers never see half a tick."""
+        if self._aredis:
+            async with self._aredis.pipeline(transaction=True) as pipe:
+                for key, value in values.items():
+                    pipe.set(key, value)
+                await pipe.execute()
+            return
+        self._memory.update(values)
+
+    async def aclose(self) -> None:
+        if self._aredis:
+            await self._aredis.aclose(close_connection_pool=True)
+        if self._redis:
+            self._redis.close()
@@ -0,0 +1,40 @@
+import pytest
+
+from app.core.simulation_engine import SimulationEngine
+from app.ingestion.osm_loader import Segment, _distance_km
+
+
+def _grid_segments(size: int) -> list[Segment]:
+    segments = []
+    step = 0.005
+    for row in range(size):
+        for col in range(size):
+            lat, lon = 6.45 + row * step, 3.30 + col * step
+            for end_lat, end_lon in ((lat + step, lon), (lat, lon + step)):
+                if end_lat > 6.45 + (size - 1) * step + 1e-9 or end_lon > 3.30 + (size - 1) * step + 1e-9:
+                    continue
+                length_km = _distance_km(lat, lon, end_lat, end_lon)
+                segments.append(
+                    Segment(len(segments) + 1, lat, lon, end_lat, end_lon, length_km, 1000, 50.0, "primary")
+                )
+    return segments
+
+
+@pytest.fixture
+def grid_segments():
+    """Builds a connected `size` x `size` grid of segments starting at (6.45, 3.30), 0.005 degrees apart."""
+    return _grid_segments
+
+
+@pytest.fixture
+def grid_simulation(monkeypatch):
+    """Builds a `SimulationEngine` over a `size` x `size` grid instead of the synthetic Lagos network."""
+
+    def build(size: int, total_vehicles: int = 5000, seed: int = 3) -> SimulationEngine:
+        monkeypatch.setattr(
+            "app.core.simulation_engine.generate_synthetic_lagos_segments",
+            lambda num_segments, seed: _grid_segments(size),
+        )
+        return SimulationEngine(num_segments=0, total_vehicles=total_vehicles, tick_interval_seconds=1, seed=seed)
+
+    return build
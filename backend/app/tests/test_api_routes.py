@@ -1,15 +1,26 @@
 from __future__ import annotations
 
+import asyncio
+import gzip
+import json
 from types import SimpleNamespace
 
+import numpy as np
 import pytest
 from fastapi import HTTPException
 
-from app.api.heatmap import get_live_segments
+from app.api.heatmap import _sse_frames, get_live_heatmap, get_live_segments, live_stream_socket
+from app.api.network import get_network_segments
+from app.api.prediction import model_metrics, prediction_for_segment
 from app.api.routing import Coordinate, RouteAnalyzeRequest, SimulationControlRequest, analyze_route, set_simulation_controls
 from app.core.prediction_engine import PredictionEngine
 from app.core.routing_engine import RoutingEngine
 from app.core.simulation_engine import SimulationEngine
+from app.services.broadcaster import Broadcaster
+from app.services.change_log import ChangeLog
+from app.services.compression import CompressedBodies
+from app.services.payloads import LIVE_ROWS_KEY, MODEL_METRICS_KEY, SIM_STATUS_KEY, encode, encode_rows, encode_versioned
+from app.services.scheduler import SimulationScheduler
 from app.services.state_cache import StateCache
 
 def _build_request_context():
@@ -30,22 +41,23 @@ def _build_request_context():
             }
         )
 
-    state_cache.set_json("live_segments", enriched_rows)
-    state_cache.set_json("sim_status", simulation_engine.get_status())
+    state_cache.set_bytes(LIVE_ROWS_KEY, encode_rows(enriched_rows, simulation_engine.tick_count, 0, 0.0))
+    state_cache.set_bytes(SIM_STATUS_KEY, encode(simulation_engine.get_status()))
 
     app_state = SimpleNamespace(
         simulation_engine=simulation_engine,
         prediction_engine=prediction_engine,
         routing_engine=routing_engine,
         state_cache=state_cache,
+        compressed_bodies=CompressedBodies(),
     )
-    request = SimpleNamespace(app=SimpleNamespace(state=app_state))
+    request = SimpleNamespace(app=SimpleNamespace(state=app_state), headers={})
     return request
 
 
 def test_live_segments_returns_extended_fields_and_status():
     request = _build_request_context()
-    payload = get_live_segments(request=request, limit=5)
+    payload = json.loads(asyncio.run(get_live_segments(request=request, limit=5)).body)
 
     assert "items" in payload
     assert "status" in payload
@@ -111,3 +123,194 @@ def test_route_analyze_returns_current_and_predicted_travel_times():
 
     assert "estimated_current_travel_time_min" in result
     assert "predicted_travel_time_10_15_min" in result
+
+
+def test_segment_prediction_serves_history_from_the_simulation_buffer():
+    request = _build_request_context()
+    sim = request.app.state.simulation_engine
+    for _ in range(3):
+        sim.tick()
+    segment_id = sim.segments[4].id
+
+    result = prediction_for_segment(segment_id, request)
+
+    assert len(result["historical_congestion"]) == 4
+    assert result["historical_congestion"][-1] == round(float(sim.congestion_index[4]), 4)
+
+
+def test_live_heatmap_since_tick_returns_changed_rows_or_a_full_snapshot():
+    request = _build_request_context()
+    state = request.app.state
+    rows = [{"segment_id": idx, "congestion_index": 0.1} for idx in range(4)]
+    state.state_cache.set_bytes(LIVE_ROWS_KEY, encode_rows(rows, 3, 0, 0.0))
+    change_log = ChangeLog(epsilon=0.01)
+    values = np.zeros((4, 1))
+    change_log.record(2, values)
+    values[2, 0] = 0.5
+    change_log.record(3, values)
+    state.scheduler = SimpleNamespace(change_log=change_log)
+
+    delta = json.loads(asyncio.run(get_live_heatmap(request=request, since_tick=2)).body)
+    assert delta["full"] is False and delta["tick"] == 3
+    assert delta["items"] == [rows[2]]
+
+    full = json.loads(asyncio.run(get_live_heatmap(request=request, since_tick=0)).body)
+    assert full["full"] is True and full["items"] == rows
+    assert json.loads(asyncio.run(get_live_heatmap(request=request, since_tick=None)).body)["count"] == 4
+
+    # Paused: the scheduler keeps recording tick 3, which must not look like a change or a reset.
+    for _ in range(3):
+        change_log.record(3, values)
+    paused = json.loads(asyncio.run(get_live_heatmap(request=request, since_tick=3)).body)
+    assert paused["full"] is False and paused["items"] == []
+    assert json.loads(asyncio.run(get_live_heatmap(request=request, since_tick=2)).body)["items"] == [rows[2]]
+
+    # A cursor from before a reset is answered with every row, even when its tick is covered again.
+    assert delta["epoch"] == change_log.epoch
+    change_log.clear()
+    for tick in (1, 2, 3):
+        change_log.record(tick, values)
+    stale = json.loads(asyncio.run(get_live_heatmap(request=request, since_tick=2, epoch=delta["epoch"])).body)
+    assert stale["full"] is True and stale["items"] == rows
+    current = json.loads(asyncio.run(get_live_heatmap(request=request, since_tick=2, epoch=change_log.epoch)).body)
+    assert current["full"] is False and current["items"] == []
+
+
+def test_live_stream_events_emit_snapshot_then_deltas():
+    broadcaster = Broadcaster()
+    broadcaster.publish(lambda: ("delta", b'{"a":1}'), lambda: ("snapshot", b'{"all":1}'))
+
+    async def read_two():
+        frames = _sse_frames(SimpleNamespace(), broadcaster)
+        first = await anext(frames)
+        broadcaster.publish(lambda: ("delta", b'{"a":2}'), lambda: ("snapshot", b'{"all":2}'))
+        second = await anext(frames)
+        await frames.aclose()
+        return first, second
+
+    first, second = asyncio.run(read_two())
+    assert first == b'event: snapshot\ndata: {"all":1}\n\n'
+    assert second == b'event: delta\ndata: {"a":2}\n\n'
+    assert len(broadcaster) == 0
+
+
+def test_live_stream_socket_sends_shared_bytes_and_unsubscribes_on_send_errors():
+    broadcaster = Broadcaster()
+    frame = b'{"type":"snapshot"}'
+    broadcaster.publish(lambda: ("delta", b"{}"), lambda: ("snapshot", frame))
+    sent = []
+
+    async def accept():
+        pass
+
+    async def send_bytes(data: bytes):
+        if sent:
+            raise RuntimeError("Cannot call send once a close message has been sent.")
+        sent.append(data)
+
+    websocket = SimpleNamespace(
+        app=SimpleNamespace(state=SimpleNamespace(scheduler=SimpleNamespace(broadcaster=broadcaster))),
+        accept=accept,
+        send_bytes=send_bytes,
+    )
+
+    async def stream():
+        task = asyncio.create_task(live_stream_socket(websocket))
+        await asyncio.sleep(0)
+        broadcaster.publish(lambda: ("delta", b'{"type":"delta"}'), lambda: ("snapshot", frame))
+        await asyncio.wait_for(task, 1.0)
+
+    asyncio.run(stream())
+    assert sent[0] is frame
+    assert len(broadcaster) == 0
+
+    # Anything else is a bug in the send loop: it propagates, and the client is still unsubscribed.
+    async def broken_send(data: bytes):
+        raise ValueError("not a disconnect")
+
+    websocket.send_bytes = broken_send
+    with pytest.raises(ValueError):
+        asyncio.run(live_stream_socket(websocket))
+    assert len(broadcaster) == 0
+
+
+def test_dynamic_rows_join_static_network_into_full_rows():
+    request = _build_request_context()
+    state = request.app.state
+    state.simulation_engine.tick_interval_seconds = 0
+    state.scheduler = SimulationScheduler(state.simulation_engine, state.prediction_engine, state.state_cache)
+
+    async def run_one_tick():
+        await state.scheduler.start()
+        while state.simulation_engine.tick_count < 1:
+            await asyncio.sleep(0.01)
+        await state.scheduler.stop()
+
+    asyncio.run(run_one_tick())
+
+    network = get_network_segments(request)
+    static = {row["segment_id"]: row for row in json.loads(network.body)["items"]}
+    assert len(static) == 80 and "geometry" in next(iter(static.values()))
+
+    full = json.loads(asyncio.run(get_live_segments(request=request, limit=80)).body)["items"]
+    dynamic = json.loads(asyncio.run(get_live_segments(request=request, limit=80, fields="dynamic")).body)["items"]
+    assert "geometry" not in dynamic[0] and "predicted_congestion" in dynamic[0]
+    assert full == [{**row, **static[row["segment_id"]]} for row in dynamic]
+
+    request.headers = {"if-none-match": network.headers["etag"]}
+    not_modified = get_network_segments(request)
+    assert not_modified.status_code == 304 and not_modified.body == b""
+
+
+def test_live_and_metrics_endpoints_answer_conditional_requests():
+    request = _build_request_context()
+    state = request.app.state
+    state.state_cache.set_bytes(MODEL_METRICS_KEY, encode_versioned(4, {"rmse": 0.1}))
+
+    response = asyncio.run(get_live_heatmap(request=request, since_tick=None))
+    etag = response.headers["etag"]
+    assert response.status_code == 200 and "last-modified" in response.headers
+
+    request.headers = {"if-none-match": etag, "accept-encoding": "gzip"}
+    assert asyncio.run(get_live_heatmap(request=request, since_tick=None)).status_code == 304
+    assert asyncio.run(get_live_segments(request=request, limit=5)).headers["etag"] != etag
+
+    request.headers = {"accept-encoding": "gzip"}
+    compressed = asyncio.run(get_live_heatmap(request=request, since_tick=None))
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(compressed.body) == response.body
+
+    request.headers = {}
+    metrics = asyncio.run(model_metrics(request))
+    assert json.loads(metrics.body) == {"rmse": 0.1}
+    request.headers = {"if-none-match": metrics.headers["etag"]}
+    assert asyncio.run(model_metrics(request)).status_code == 304
+
+
+def test_paused_scheduler_publishes_nothing_new():
+    request = _build_request_context()
+    state = request.app.state
+    sim = state.simulation_engine
+    sim.tick_interval_seconds = 0
+    scheduler = SimulationScheduler(sim, state.prediction_engine, state.state_cache)
+
+    async def run_paused():
+        await scheduler.start()
+        while sim.tick_count < 2:
+            await asyncio.sleep(0.01)
+        sim.set_paused(True)
+        await asyncio.sleep(0.05)
+        subscription = scheduler.broadcaster.subscribe()
+        subscription.queue.get_nowait()  # The initial snapshot.
+        published, rows = scheduler.broadcaster.published, state.state_cache.get_bytes(LIVE_ROWS_KEY)
+        observations = len(state.prediction_engine.rows)
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        return subscription, published, rows, observations
+
+    subscription, published, rows, observations = asyncio.run(run_paused())
+    assert subscription.queue.empty()
+    assert scheduler.broadcaster.published == published
+    assert state.state_cache.get_bytes(LIVE_ROWS_KEY) is rows
+    assert len(state.prediction_engine.rows) == observations
+    assert json.loads(state.state_cache.get_bytes(SIM_STATUS_KEY))["paused"] is True
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from app.services.broadcaster import Broadcaster
+
+
+def _counting_factory(kind: str, calls: list[str]):
+    def build():
+        calls.append(kind)
+        return kind, b'{"type":"%s"}' % kind.encode()
+
+    return build
+
+
+def test_publish_encodes_each_frame_once_and_shares_it():
+    broadcaster = Broadcaster(queue_size=4)
+    calls: list[str] = []
+    broadcaster.publish(_counting_factory("delta", calls), _counting_factory("snapshot", calls))
+    assert calls == []  # Nobody listening: nothing is encoded.
+
+    first, second = broadcaster.subscribe(), broadcaster.subscribe()
+    assert calls == ["snapshot"]
+    assert first.queue.get_nowait() is second.queue.get_nowait()
+
+    broadcaster.publish(_counting_factory("delta", calls), _counting_factory("snapshot", calls))
+    assert calls == ["snapshot", "delta"]
+    assert first.queue.get_nowait() is second.queue.get_nowait()
+    assert broadcaster.stats()["subscribers"] == 2
+
+
+def test_slow_subscriber_is_resynced_with_latest_snapshot():
+    broadcaster = Broadcaster(queue_size=2)
+    slow = broadcaster.subscribe()
+    fast = broadcaster.subscribe()
+    for _ in range(4):
+        broadcaster.publish(lambda: ("delta", b"d"), lambda: ("snapshot", b"s"))
+        while not fast.queue.empty():
+            fast.queue.get_nowait()
+
+    frames = []
+    while not slow.queue.empty():
+        frames.append(slow.queue.get_nowait())
+    assert frames == [("snapshot", b"s"), ("delta", b"d")]
+    assert slow.dropped == 2 and fast.dropped == 0
+
+    broadcaster.unsubscribe(slow)
+    assert len(broadcaster) == 1
@@ -0,0 +1,72 @@
+import numpy as np
+
+from app.services.change_log import ChangeLog
+
+
+def test_changes_accumulate_against_last_reported_values():
+    log = ChangeLog(epsilon=0.05, max_ticks=10)
+    values = np.zeros((4, 2))
+
+    assert log.record(1, values).tolist() == [0, 1, 2, 3]
+    values[1, 0] = 0.03
+    assert log.record(2, values).tolist() == []
+    values[1, 0] = 0.06
+    values[3, 1] = 0.5
+    assert log.record(3, values).tolist() == [1, 3]
+
+    assert log.changed_since(1, 3).tolist() == [1, 3]
+    assert log.changed_since(2, 3).tolist() == [1, 3]
+    assert log.changed_since(3, 3).tolist() == []
+    assert log.changed_since(0, 3).tolist() == [0, 1, 2, 3]
+
+
+def test_uncovered_ticks_and_resets_fall_back_to_full_snapshots():
+    log = ChangeLog(epsilon=0.05, max_ticks=3)
+    values = np.zeros((2, 1))
+    for tick in range(1, 7):
+        values[tick % 2, 0] += 1.0
+        log.record(tick, values)
+
+    assert log.changed_since(2, 6) is None
+    assert log.changed_since(3, 6).tolist() == [0, 1]
+    assert log.changed_since(7, 6) is None
+
+    assert log.record(1, values).tolist() == [0, 1]
+    assert log.changed_since(5, 1) is None
+
+
+def test_paused_simulation_repeating_a_tick_changes_nothing():
+    log = ChangeLog(epsilon=0.05, max_ticks=10)
+    values = np.zeros((3, 1))
+    for tick in range(1, 4):
+        values[0, 0] += 1.0
+        log.record(tick, values)
+
+    for _ in range(5):
+        assert log.record(3, values).tolist() == []
+
+    assert log.changed_since(2, 3).tolist() == [0]
+    assert log.changed_since(3, 3).tolist() == []
+    assert log.changed_since(1, 3).tolist() == [0]
+
+
+def test_cursor_from_before_a_reset_gets_a_full_snapshot():
+    log = ChangeLog(epsilon=0.05, max_ticks=200)
+    values = np.zeros((3, 1))
+    for tick in range(1, 61):
+        log.record(tick, values)
+    old_epoch = log.epoch
+
+    log.clear()
+    values[:] = 1.0
+    for tick in range(1, 101):
+        log.record(tick, values)
+
+    assert log.epoch != old_epoch
+    assert log.changed_since(50, 100, old_epoch) is None
+    assert log.changed_since(50, 100, log.epoch).tolist() == []
+    assert log.changed_since(0, 100, log.epoch).tolist() == [0, 1, 2]
+
+    epoch = log.epoch
+    assert log.record(1, values).tolist() == [0, 1, 2]
+    assert log.epoch != epoch and log.changed_since(50, 1, epoch) is None
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import gzip
+
+from app.services.compression import CompressedBodies, negotiate
+
+
+def test_negotiate_honours_zero_quality_and_falls_back_to_identity():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("deflate;q=1.0, gzip;q=0") is None
+    assert negotiate("*") in {"gzip", "br"}
+    assert negotiate(None) is None
+
+
+def test_bodies_are_compressed_once_per_tag():
+    bodies = CompressedBodies(min_size=100)
+    builds = []
+
+    def build() -> bytes:
+        builds.append(1)
+        return b'{"items":[' + b'{"segment_id":1},' * 200 + b"{}]}"
+
+    first, coding = bodies.encode('W/"7"', build, "gzip")
+    second, _ = bodies.encode('W/"7"', build, "gzip")
+    assert coding == "gzip" and second is first and len(builds) == 1
+    assert gzip.decompress(first) == build()
+
+    assert bodies.encode('W/"7"', build, None) == (build(), None)
+    assert bodies.encode('W/"8"', lambda: b"{}", "gzip") == (b"{}", None)
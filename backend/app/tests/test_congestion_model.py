@@ -1,4 +1,7 @@
-from app.core.congestion_model import compute_speed_and_congestion
+import numpy as np
+import pytest
+
+from app.core.congestion_model import compute_speed_and_congestion, compute_speed_and_congestion_batch
 
 
 def test_zero_vehicles_has_low_congestion():
@@ -18,3 +21,16 @@ def test_safe_behavior_with_zero_capacity():
     avg_speed, congestion = compute_speed_and_congestion(vehicle_count=10, capacity=0, free_flow_speed=50)
     assert avg_speed >= 1.0
     assert 0.0 <= congestion <= 1.0
+
+
+def test_batch_matches_scalar_formula():
+    vehicle_counts = np.array([0, 10, 500, 2000, 10])
+    capacities = np.array([1000, 1000, 1000, 1000, 0])
+    free_flow = np.array([60.0, 50.0, 40.0, 60.0, 50.0])
+
+    speeds, congestion = compute_speed_and_congestion_batch(vehicle_counts, capacities, free_flow)
+
+    for idx in range(len(vehicle_counts)):
+        expected = compute_speed_and_congestion(int(vehicle_counts[idx]), int(capacities[idx]), float(free_flow[idx]))
+        assert speeds[idx] == pytest.approx(expected[0])
+        assert congestion[idx] == pytest.approx(expected[1])
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from app.core.contraction_hierarchy import ContractionHierarchy
+from app.core.path_search import dijkstra
+from app.core.road_graph import RoadGraph
+from app.core.routing_engine import _project_km
+from app.ingestion.osm_loader import Segment
+
+
+def test_customized_queries_match_dijkstra_for_every_metric(grid_segments):
+    segments = grid_segments(25)
+    # A parallel segment and a disconnected island exercise duplicate arcs and unreachable pairs.
+    segments.append(Segment(len(segments) + 1, 6.45, 3.30, 6.455, 3.30, 0.6, 1000, 50.0, "primary"))
+    segments.append(Segment(len(segments) + 1, 6.70, 3.60, 6.701, 3.601, 0.15, 1000, 50.0, "primary"))
+    graph = RoadGraph.from_segments(segments)
+    hierarchy = ContractionHierarchy(graph, _project_km(graph.node_lat, graph.node_lon, 6.5))
+    rng = np.random.default_rng(6)
+    pairs = rng.integers(0, graph.num_nodes, size=(30, 2)).tolist() + [[0, graph.num_nodes - 1]]
+
+    for _ in range(3):
+        weights = rng.uniform(0.1, 3.0, len(segments))
+        metric = hierarchy.customize(weights)
+        weight_list = weights.tolist()
+        for source, target in pairs:
+            path, cost, scanned = hierarchy.query(metric, source, target)
+            _, expected, _ = dijkstra(graph, weight_list, source, target)
+            assert cost == pytest.approx(expected)
+            if np.isfinite(expected):
+                assert sum(weight_list[idx] for idx in path) == pytest.approx(expected)
+            assert scanned < graph.num_nodes
+
+
+def test_path_segments_are_contiguous(grid_segments):
+    segments = grid_segments(15)
+    graph = RoadGraph.from_segments(segments)
+    hierarchy = ContractionHierarchy(graph, _project_km(graph.node_lat, graph.node_lon, 6.5))
+    metric = hierarchy.customize(np.random.default_rng(1).uniform(0.5, 2.0, len(segments)))
+
+    path, _, _ = hierarchy.query(metric, 0, graph.num_nodes - 1)
+
+    node = 0
+    for idx in path:
+        start, end = graph.segment_nodes[idx].tolist()
+        assert node in (start, end)
+        node = end if node == start else start
+    assert node == graph.num_nodes - 1
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from app.core.feature_engineering import FEATURE_COLUMNS, build_feature_row
+from app.core.simulation_engine import SimulationEngine
+
+
+def _assert_matrix_matches_rows(engine: SimulationEngine) -> None:
+    matrix = engine.feature_matrix()
+    assert matrix.shape == (len(engine.segments), len(FEATURE_COLUMNS))
+
+    for idx, segment in enumerate(engine.segments):
+        state = engine.live_state[segment.id]
+        expected = build_feature_row(
+            segment_id=segment.id,
+            timestamp=engine.current_time,
+            congestion_history=engine.segment_history(segment.id),
+            capacity=segment.capacity,
+            vehicle_count=int(engine.vehicle_count[idx]),
+            incident_flag=state["incident_flag"],
+        )
+        for col, name in enumerate(FEATURE_COLUMNS):
+            assert matrix[idx, col] == pytest.approx(expected[name], abs=1e-6), name
+
+
+@pytest.mark.parametrize("history_window", [3600, 8])
+def test_batch_matrix_matches_single_row_features(history_window):
+    engine = SimulationEngine(num_segments=25, total_vehicles=2500, tick_interval_seconds=1, seed=5, history_window=history_window)
+    _assert_matrix_matches_rows(engine)
+
+    for tick in range(130):
+        engine.tick()
+        if tick in {3, 20, 129}:
+            _assert_matrix_matches_rows(engine)
+
+    engine.reset()
+    engine.tick()
+    _assert_matrix_matches_rows(engine)
+
+
+def test_build_feature_row_handles_empty_history():
+    row = build_feature_row(
+        segment_id=1,
+        timestamp=datetime(2024, 1, 1, 8, 0),
+        congestion_history=[],
+        capacity=100,
+        vehicle_count=50,
+        incident_flag=0,
+    )
+    assert row["lag_1"] == 0.0
+    assert row["rolling_mean_60"] == 0.0
+    assert row["rush_hour"] == 1
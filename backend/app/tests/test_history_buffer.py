@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.core.history_buffer import HistoryBuffer
+from app.core.simulation_engine import SimulationEngine
+
+
+def test_tail_stays_ordered_across_compaction():
+    buffer = HistoryBuffer(num_rows=3, window=5, slack=2)
+    for step in range(1, 13):
+        buffer.append(np.full(3, step, dtype=np.float32))
+
+    assert len(buffer) == 5
+    assert buffer.tail().tolist()[0] == [8.0, 9.0, 10.0, 11.0, 12.0]
+    assert buffer.tail(2).tolist()[2] == [11.0, 12.0]
+    assert np.shares_memory(buffer.tail(), buffer._data)
+
+
+def test_lag_falls_back_to_latest_when_history_is_short():
+    buffer = HistoryBuffer(num_rows=2, window=10)
+    assert buffer.lag(1).tolist() == [0.0, 0.0]
+
+    buffer.append(np.array([0.1, 0.2]))
+    buffer.append(np.array([0.3, 0.4]))
+
+    assert buffer.lag(1).tolist() == np.array([0.3, 0.4], dtype=np.float32).tolist()
+    assert buffer.lag(2).tolist() == np.array([0.1, 0.2], dtype=np.float32).tolist()
+    assert buffer.lag(6).tolist() == buffer.lag(1).tolist()
+
+
+def test_simulation_history_respects_configured_window():
+    engine = SimulationEngine(num_segments=10, total_vehicles=1000, tick_interval_seconds=1, seed=3, history_window=8)
+    for _ in range(20):
+        engine.tick()
+
+    history = engine.segment_history(1)
+    assert len(history) == 8
+    assert history[-1] == np.float32(engine.congestion_index[0])
+    assert len(engine.segment_history(1, limit=3)) == 3
+
+    engine.reset()
+    assert len(engine.segment_history(1)) == 1
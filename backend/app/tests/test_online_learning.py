@@ -0,0 +1,22 @@
+import numpy as np
+
+from app.core.online_learning import OnlineRLSRegressor
+
+
+def test_rls_recovers_linear_relationship_and_tracks_drift():
+    rng = np.random.default_rng(0)
+    model = OnlineRLSRegressor(num_features=3, forgetting=0.9)
+    weights = np.array([0.5, -0.2, 0.1])
+
+    for _ in range(50):
+        x = rng.uniform(0, 1, size=(100, 3))
+        model.partial_fit(x, x @ weights + 0.3)
+    assert np.allclose(model.coef_, weights, atol=1e-2)
+    assert abs(model.intercept_ - 0.3) < 1e-2
+
+    drifted = np.array([0.1, 0.4, -0.3])
+    for _ in range(80):
+        x = rng.uniform(0, 1, size=(100, 3))
+        model.partial_fit(x, x @ drifted)
+    assert np.allclose(model.coef_, drifted, atol=1e-2)
+    assert model.prequential_rmse is not None
@@ -0,0 +1,34 @@
+import json
+
+from app.services.payloads import EncodedRows, StaticNetwork, encode, encode_rows, etag_matches, live_body, merge_rows
+
+
+def test_encoded_rows_slice_and_select_without_decoding():
+    rows = [{"segment_id": idx, "congestion_index": idx / 10, "road_type": "primary"} for idx in range(5)]
+    rows_view = EncodedRows(encode_rows(rows, tick=7, model_version=3, published_at=12.5))
+
+    assert (rows_view.tick, rows_view.model_version, rows_view.published_at, rows_view.count) == (7, 3, 12.5, 5)
+    assert json.loads(rows_view.array()) == rows
+    assert json.loads(rows_view.array(2)) == rows[:2]
+    assert json.loads(rows_view.select([4, 1])) == [rows[4], rows[1]]
+    assert rows_view.select([]) == b"[]"
+
+
+def test_live_body_matches_the_json_contract():
+    rows = [{"segment_id": 1}, {"segment_id": 2}]
+    body = live_body(EncodedRows(encode_rows(rows, 1, 0, 0.0)), encode({"tick": 1}), limit=1)
+
+    assert json.loads(body) == {"count": 2, "items": rows[:1], "status": {"tick": 1}}
+    assert json.loads(live_body(None, None)) == {"count": 0, "items": [], "status": {}}
+    assert json.loads(EncodedRows(encode_rows([], 0, 0, 0.0)).array()) == []
+
+
+def test_static_fragments_merge_into_dynamic_rows():
+    network = StaticNetwork([{"segment_id": 1, "road_type": "primary", "geometry": [[6.4, 3.3], [6.5, 3.4]]}])
+    merged = merge_rows([encode({"segment_id": 1, "avg_speed": 30.0})], network.fragments)
+
+    assert json.loads(merged[0]) == {"segment_id": 1, "avg_speed": 30.0, "road_type": "primary", "geometry": [[6.4, 3.3], [6.5, 3.4]]}
+    assert etag_matches(network.etag, network.etag)
+    assert etag_matches(f'"other", W/{network.etag}', network.etag)
+    assert etag_matches("*", network.etag)
+    assert not etag_matches(None, network.etag) and not etag_matches('"other"', network.etag)
@@ -0,0 +1,62 @@
+import numpy as np
+
+from app.api.prediction import prediction_for_segment
+from app.core.prediction_cache import PredictionCache
+from app.core.prediction_engine import PredictionEngine
+from app.tests.test_api_routes import _build_request_context
+
+
+def test_cache_invalidates_on_new_tick_or_model_version():
+    cache = PredictionCache()
+    forecast = (np.zeros(3), np.zeros(3), np.ones(3))
+    cache.put(tick=5, model_version=1, horizon_minutes=0, forecast=forecast)
+
+    assert cache.get(5, 1, 0) is forecast
+    assert cache.get(5, 1, 12) is None
+    assert cache.get(5, 2, 0) is None
+    assert cache.get(6, 1, 0) is None
+
+    cache.put(tick=6, model_version=1, horizon_minutes=12, forecast=forecast)
+    assert cache.get(5, 1, 0) is None
+    assert cache.get(6, 1, 12) is forecast
+
+
+def test_forecast_is_scored_once_per_tick_and_model():
+    engine = PredictionEngine()
+    calls = []
+    original = engine.predict_batch
+
+    def counting_predict_batch(matrix):
+        calls.append(len(matrix))
+        return original(matrix)
+
+    engine.predict_batch = counting_predict_batch
+    matrix = np.zeros((4, 11))
+
+    engine.forecast(1, lambda: matrix)
+    engine.forecast(1, lambda: matrix)
+    assert len(calls) == 1
+
+    engine._install_model(None, "baseline_last")
+    engine.forecast(1, lambda: matrix)
+    engine.forecast(2, lambda: matrix)
+    assert len(calls) == 3
+
+
+def test_prediction_endpoint_reads_the_scheduler_forecast():
+    request = _build_request_context()
+    simulation_engine = request.app.state.simulation_engine
+    prediction_engine = request.app.state.prediction_engine
+    size = len(simulation_engine.segments)
+    prediction_engine.cache.put(
+        simulation_engine.tick_count,
+        prediction_engine.model_version,
+        0,
+        (np.full(size, 0.42), np.full(size, 0.3), np.full(size, 0.5)),
+    )
+
+    payload = prediction_for_segment(segment_id=3, request=request)
+
+    assert payload["predicted_congestion"] == 0.42
+    assert payload["confidence_lower"] == 0.3
+    assert payload["confidence_upper"] == 0.5
@@ -0,0 +1,112 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from app.core.feature_engineering import FEATURE_COLUMNS
+from app.core.prediction_engine import PredictionEngine
+from app.core.simulation_engine import SimulationEngine
+
+
+def _collect(prediction_engine: PredictionEngine, ticks: int = 30) -> SimulationEngine:
+    simulation_engine = SimulationEngine(num_segments=40, total_vehicles=4000, tick_interval_seconds=1, seed=12)
+    for _ in range(ticks):
+        simulation_engine.tick()
+        prediction_engine.add_observations(
+            simulation_engine.feature_matrix(),
+            targets=simulation_engine.congestion_index,
+            segment_ids=simulation_engine.segment_ids,
+            tick=simulation_engine.tick_count,
+        )
+    return simulation_engine
+
+
+@pytest.mark.parametrize("model_name", ["baseline_last", "baseline_rolling_mean_15", "linear_regression"])
+def test_predict_batch_matches_single_row_predict(model_name):
+    prediction_engine = PredictionEngine()
+    simulation_engine = _collect(prediction_engine)
+    matrix = simulation_engine.feature_matrix()
+
+    prediction_engine.model_name = model_name
+    if model_name == "linear_regression":
+        data = prediction_engine.rows.columns()
+        prediction_engine.model = LinearRegression().fit(data["features"], data["target"])
+
+    pred, lower, upper = prediction_engine.predict_batch(matrix)
+    assert pred.shape == lower.shape == upper.shape == (len(simulation_engine.segments),)
+    assert np.all((lower <= pred) & (pred <= upper))
+
+    for idx in (0, 7, 39):
+        single = prediction_engine.predict(dict(zip(FEATURE_COLUMNS, matrix[idx])))
+        assert single == pytest.approx((pred[idx], lower[idx], upper[idx]))
+
+
+def test_train_selects_a_model_and_reports_metrics():
+    prediction_engine = PredictionEngine()
+    _collect(prediction_engine)
+
+    prediction_engine.train()
+
+    assert prediction_engine.model_name != "untrained"
+    assert prediction_engine.metrics["rows"] == len(prediction_engine.rows)
+    assert prediction_engine.last_retrained_at is not None
+
+
+def test_candidates_respect_budget_and_report_fit_times():
+    prediction_engine = PredictionEngine(training_workers=0, candidate_budget_seconds=0.0)
+    _collect(prediction_engine)
+
+    prediction_engine.train()
+
+    candidates = prediction_engine.metrics["candidates"]
+    assert set(candidates) == {"linear_regression", "random_forest", "gradient_boosting", "online_rls"}
+    assert candidates["linear_regression"]["status"] == "completed"
+    for name in ("random_forest", "gradient_boosting"):
+        assert candidates[name]["status"] == "budget_exhausted"
+        assert candidates[name]["stages"] == 1
+        assert candidates[name]["fit_seconds"] >= 0.0
+
+
+def test_overrunning_candidates_are_terminated(monkeypatch):
+    monkeypatch.setattr("app.core.prediction_engine.CANDIDATE_GRACE_SECONDS", 0.0)
+    prediction_engine = PredictionEngine(training_workers=2, candidate_budget_seconds=0.0)
+    _collect(prediction_engine)
+
+    prediction_engine.train()
+
+    candidates = prediction_engine.metrics["candidates"]
+    assert all(candidates[name]["status"] == "timed_out" for name in ("linear_regression", "random_forest", "gradient_boosting"))
+    assert multiprocessing.active_children() == []
+
+
+def test_online_mode_learns_every_tick_without_retraining():
+    prediction_engine = PredictionEngine(learning_mode="online")
+    simulation_engine = _collect(prediction_engine)
+
+    assert prediction_engine.model_name == "online_rls"
+    assert prediction_engine.online_model.n_seen == len(prediction_engine.rows)
+    assert prediction_engine.metrics["rmse"] < 0.05
+
+    coef_before = prediction_engine.online_model.coef_.copy()
+    _collect(prediction_engine, ticks=1)
+    assert not np.array_equal(coef_before, prediction_engine.online_model.coef_)
+
+    pred, _, _ = prediction_engine.predict_batch(simulation_engine.feature_matrix())
+    assert np.all((pred >= 0.0) & (pred <= 1.0))
+
+    prediction_engine.maybe_retrain(tick=900)
+    assert prediction_engine.model_name == "online_rls"
+
+
+def test_batch_mode_updates_the_online_learner_only_while_it_serves():
+    prediction_engine = PredictionEngine()
+    _collect(prediction_engine)
+    assert prediction_engine.online_model.n_seen == 0
+    assert prediction_engine.model_version == 0
+
+    prediction_engine._install_model(prediction_engine.online_model, "online_rls")
+    version = prediction_engine.model_version
+    _collect(prediction_engine, ticks=2)
+    assert prediction_engine.online_model.n_seen == 80
+    assert prediction_engine.model_version == version + 2
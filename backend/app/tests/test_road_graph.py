@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+from scipy.sparse.csgraph import csgraph_from_dense, dijkstra as scipy_dijkstra
+
+from app.core.path_search import (
+    astar,
+    bidirectional_dijkstra,
+    dijkstra,
+    one_to_many,
+    time_dependent_dijkstra,
+    via_node_alternatives,
+)
+from app.core.road_graph import RoadGraph
+from app.core.routing_engine import _project_km
+from app.ingestion.osm_loader import Segment, generate_synthetic_lagos_segments
+
+
+def test_csr_adjacency_matches_segment_endpoints():
+    segments = generate_synthetic_lagos_segments(num_segments=300, seed=5)
+    graph = RoadGraph.from_segments(segments)
+
+    assert graph.num_edges == 2 * len(segments)
+    assert graph.indptr[-1] == graph.num_edges
+    for idx, (start, end) in enumerate(graph.segment_nodes.tolist()):
+        segment = segments[idx]
+        assert (round(graph.node_lat[start], 4), round(graph.node_lon[start], 4)) == (
+            round(segment.start_lat, 4),
+            round(segment.start_lon, 4),
+        )
+        start_edges = range(graph.indptr[start], graph.indptr[start + 1])
+        end_edges = range(graph.indptr[end], graph.indptr[end + 1])
+        assert any(graph.neighbors[e] == end and graph.edge_segment[e] == idx for e in start_edges)
+        assert any(graph.neighbors[e] == start and graph.edge_segment[e] == idx for e in end_edges)
+
+
+def test_dijkstra_matches_scipy_shortest_paths():
+    segments = generate_synthetic_lagos_segments(num_segments=400, seed=9)
+    graph = RoadGraph.from_segments(segments)
+    weights = np.random.default_rng(3).uniform(0.5, 5.0, len(segments))
+    sources = np.repeat(np.arange(graph.num_nodes), np.diff(graph.indptr))
+    # Parallel edges collapse to the cheaper one, which is what Dijkstra sees.
+    dense = np.full((graph.num_nodes, graph.num_nodes), np.inf)
+    np.minimum.at(dense, (sources, graph.neighbors), weights[graph.edge_segment])
+    expected = scipy_dijkstra(csgraph_from_dense(dense, null_value=np.inf), indices=0)
+
+    weight_list = weights.tolist()
+    for target in range(0, graph.num_nodes, 7):
+        path, cost, _ = dijkstra(graph, weight_list, 0, target)
+        if np.isinf(expected[target]):
+            assert path == [] and cost == float("inf")
+            continue
+        assert abs(cost - expected[target]) < 1e-9
+        assert abs(sum(weight_list[idx] for idx in path) - cost) < 1e-9
+
+
+def test_astar_and_bidirectional_match_dijkstra_with_fewer_settled_nodes(grid_segments):
+    segments = grid_segments(30)
+    graph = RoadGraph.from_segments(segments)
+    rng = np.random.default_rng(4)
+    # Minutes at speeds between 5 and 50 km/h; 50 km/h is the top free-flow speed.
+    weights = [s.length_km / rng.uniform(5.0, 50.0) * 60.0 for s in segments]
+    node_xy = _project_km(graph.node_lat, graph.node_lon, float(graph.node_lat.mean()))
+    straight = np.hypot(*(node_xy[graph.segment_nodes[:, 0]] - node_xy[graph.segment_nodes[:, 1]]).T)
+    stretch = min(1.0, float((np.array([s.length_km for s in segments]) / straight).min()))
+
+    settled = {"dijkstra": 0, "astar": 0, "bidirectional": 0}
+    for source, target in rng.integers(0, graph.num_nodes, size=(20, 2)).tolist():
+        path, cost, count = dijkstra(graph, weights, source, target)
+        settled["dijkstra"] += count
+        for name, result in (
+            ("astar", astar(graph, weights, source, target, node_xy, stretch * 60.0 / 50.0)),
+            ("bidirectional", bidirectional_dijkstra(graph, weights, source, target)),
+        ):
+            assert result[1] == pytest.approx(cost)
+            assert sum(weights[idx] for idx in result[0]) == pytest.approx(cost)
+            settled[name] += result[2]
+
+    assert settled["astar"] < settled["dijkstra"]
+    assert settled["bidirectional"] < settled["dijkstra"]
+
+
+def test_bidirectional_stops_early_when_target_is_unreachable(grid_segments):
+    segments = grid_segments(20)
+    island = Segment(len(segments) + 1, 6.70, 3.60, 6.701, 3.601, 0.15, 1000, 50.0, "primary")
+    graph = RoadGraph.from_segments(segments + [island])
+    weights = [1.0] * (len(segments) + 1)
+    target = int(graph.segment_nodes[-1, 0])
+
+    path, cost, settled = bidirectional_dijkstra(graph, weights, 0, target)
+
+    assert path == [] and cost == float("inf")
+    assert settled <= 3
+    assert dijkstra(graph, weights, 0, target)[2] == graph.num_nodes - 2
+    assert one_to_many(graph, weights, 0, [target, 0, 21]) == [float("inf"), 0.0, dijkstra(graph, weights, 0, 21)[1]]
+
+
+def test_time_dependent_search_prices_segments_at_arrival_time():
+    # Two routes from node 0 to node 1: a direct 8-minute road and a two-hop 3+3 detour
+    # whose second hop gets 10 minutes slower from minute 5 onwards.
+    segments = [
+        Segment(1, 6.50, 3.30, 6.50, 3.32, 2.0, 1000, 50.0, "primary"),
+        Segment(2, 6.50, 3.30, 6.51, 3.31, 1.0, 1000, 50.0, "primary"),
+        Segment(3, 6.51, 3.31, 6.50, 3.32, 1.0, 1000, 50.0, "primary"),
+    ]
+    graph = RoadGraph.from_segments(segments)
+    horizons = (0, 5)
+    table = np.array([[8.0, 3.0, 3.0], [8.0, 3.0, 13.0]])
+    slope = [((table[1] - table[0]) / 5).tolist(), [0.0, 0.0, 0.0]]
+
+    path, arrival, _ = time_dependent_dijkstra(graph, horizons, table.tolist(), slope, 0, 1)
+
+    assert path == [0]
+    assert arrival == pytest.approx(8.0)
+
+    static = [table[0].tolist(), table[0].tolist()]
+    path, arrival, _ = time_dependent_dijkstra(graph, horizons, static, [[0.0] * 3] * 2, 0, 1)
+    assert path == [1, 2]
+    assert arrival == pytest.approx(6.0)
+
+
+def test_via_node_alternatives_respect_stretch_and_overlap(grid_segments):
+    segments = grid_segments(15)
+    graph = RoadGraph.from_segments(segments)
+    weights = np.random.default_rng(8).uniform(0.5, 1.5, len(segments)).tolist()
+    source, target = 0, graph.num_nodes - 1
+
+    routes, settled = via_node_alternatives(graph, weights, source, target, 3, max_stretch=0.25, max_overlap=0.6)
+
+    shortest = dijkstra(graph, weights, source, target)[1]
+    assert routes[0][1] == pytest.approx(shortest)
+    assert 2 <= len(routes) <= 4
+    assert settled <= 2 * graph.num_nodes
+    for index, (path, cost, _) in enumerate(routes):
+        assert cost <= 1.25 * shortest + 1e-9
+        assert sum(weights[idx] for idx in path) == pytest.approx(cost)
+        node, visited = source, {source}
+        for idx in path:
+            start, end = graph.segment_nodes[idx].tolist()
+            node = end if node == start else start
+            assert node not in visited
+            visited.add(node)
+        assert node == target
+        for other, _, _ in routes[:index]:
+            assert sum(weights[idx] for idx in set(path) & set(other)) <= 0.6 * cost + 1e-9
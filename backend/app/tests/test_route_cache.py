@@ -0,0 +1,51 @@
+from app.core.route_cache import CachedRoute, RouteCache
+
+
+def _route(segments, weights):
+    return CachedRoute(
+        segments={"current": segments},
+        costs={"current": sum(weights["current"][idx] for idx in segments)},
+    )
+
+
+def test_entries_are_reused_within_tolerance_and_dropped_past_it():
+    cache = RouteCache(max_entries=4, tolerance=0.1)
+    weights = {"current": [1.0, 2.0, 3.0, 4.0]}
+    cache.store((1, 2), _route([0, 1], weights))
+
+    assert cache.lookup((1, 2), {"current": [1.1, 2.1, 9.0, 9.0]}) is not None
+    assert cache.lookup((1, 2), {"current": [1.5, 2.0, 3.0, 4.0]}) is None
+    assert len(cache) == 0
+    assert cache.stats()["stale"] == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_eviction_and_incident_invalidation():
+    cache = RouteCache(max_entries=2)
+    weights = {"current": [1.0, 1.0, 1.0, 1.0]}
+    cache.store("a", _route([0], weights))
+    cache.store("b", _route([1], weights))
+    cache.lookup("a", weights)
+    cache.store("c", _route([2, 3], weights))
+
+    assert cache.lookup("b", weights) is None
+    assert cache.lookup("a", weights) is not None
+
+    cache.invalidate_segment(3)
+    assert cache.lookup("c", weights) is None
+    assert cache.lookup("a", weights) is not None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_routes_from_snapshots_before_an_incident_are_refused():
+    cache = RouteCache(max_entries=4)
+    weights = {"current": [1.0, 1.0, 1.0]}
+    cache.invalidate_segment(1, tick=5)
+
+    cache.store("a", _route([0, 1], weights), tick=5)
+    cache.store("b", _route([0, 2], weights), tick=5)
+    assert cache.lookup("a", weights) is None and cache.lookup("b", weights) is not None
+    assert cache.stats()["refused"] == 1
+
+    cache.store("a", _route([0, 1], weights), tick=6)
+    assert cache.lookup("a", weights) is not None
@@ -1,5 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.core.path_search import dijkstra, via_node_alternatives
 from app.core.prediction_engine import PredictionEngine
-from app.core.routing_engine import RoutingEngine
+from app.core.route_cache import CachedRoute
+from app.core.routing_engine import RoutingEngine, _distance_km
 from app.core.simulation_engine import SimulationEngine
 
 
@@ -10,10 +17,11 @@ def test_predicted_segment_cost_uses_prediction_signal():
 
     segment_id = simulation_engine.segments[0].id
 
-    def high_congestion_predict(features):
-        return 0.9, 0.8, 1.0
+    def high_congestion_predict_batch(matrix):
+        rows = len(matrix)
+        return np.full(rows, 0.9), np.full(rows, 0.8), np.full(rows, 1.0)
 
-    prediction_engine.predict = high_congestion_predict
+    prediction_engine.predict_batch = high_congestion_predict_batch
 
     current_cost = routing_engine._segment_cost(segment_id, mode="current")
     predicted_cost = routing_engine._segment_cost(segment_id, mode="predicted")
@@ -33,3 +41,225 @@ def test_analyze_route_returns_current_and_predicted_times():
     assert "route_geometry" in result
     assert result["estimated_current_travel_time_min"] >= 0
     assert result["predicted_travel_time_10_15_min"] >= 0
+
+
+def test_cost_snapshot_is_rebuilt_once_per_tick():
+    simulation_engine = SimulationEngine(num_segments=40, total_vehicles=4000, tick_interval_seconds=1, seed=22)
+    routing_engine = RoutingEngine(simulation_engine, PredictionEngine())
+
+    snapshot = routing_engine.cost_snapshot()
+    assert routing_engine.cost_snapshot() is snapshot
+
+    segment = simulation_engine.segments[5]
+    state = simulation_engine.live_state[segment.id]
+    expected = segment.length_km / max(state["avg_speed"], 5.0) * 60.0
+    assert routing_engine._segment_cost(segment.id, mode="current") == pytest.approx(expected)
+
+    simulation_engine.tick()
+    refreshed = routing_engine.cost_snapshot()
+    assert refreshed is not snapshot
+    assert refreshed.tick == simulation_engine.tick_count
+    assert snapshot.tick == simulation_engine.tick_count - 1
+
+
+def test_background_refresh_keeps_customization_off_the_request_path():
+    simulation_engine = SimulationEngine(num_segments=40, total_vehicles=4000, tick_interval_seconds=1, seed=22)
+    routing_engine = RoutingEngine(simulation_engine, PredictionEngine())
+    builds = []
+    build_snapshot = routing_engine._build_snapshot
+    routing_engine._build_snapshot = lambda: builds.append(1) or build_snapshot()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        snapshots = list(pool.map(lambda _: routing_engine.cost_snapshot(), range(16)))
+    assert len(builds) == 1 and all(snapshot is snapshots[0] for snapshot in snapshots)
+
+    snapshot = routing_engine.refresh_snapshot()
+    simulation_engine.tick()
+    # Requests keep serving the swapped-in snapshot until the scheduler refreshes it.
+    assert routing_engine.cost_snapshot() is snapshot and len(builds) == 1
+    refreshed = routing_engine.refresh_snapshot()
+    assert refreshed.tick == simulation_engine.tick_count and routing_engine.cost_snapshot() is refreshed
+
+
+def test_snapping_matches_brute_force_nearest_node():
+    simulation_engine = SimulationEngine(num_segments=200, total_vehicles=20000, tick_interval_seconds=1, seed=8)
+    routing_engine = RoutingEngine(simulation_engine, PredictionEngine())
+    rng = np.random.default_rng(2)
+    points = np.column_stack((rng.uniform(6.35, 6.7, 25), rng.uniform(3.2, 3.55, 25)))
+
+    snapped = routing_engine.snap_nodes(points)
+
+    assert snapped.shape == (25,)
+    node_coords = list(zip(routing_engine.road_graph.node_lat, routing_engine.road_graph.node_lon))
+    for (lat, lon), node in zip(points, snapped):
+        brute = min(_distance_km(lat, lon, *coords) for coords in node_coords)
+        assert _distance_km(lat, lon, *node_coords[int(node)]) == pytest.approx(brute, abs=1e-3)
+        assert routing_engine._nearest_node(lat, lon) == node
+
+
+def test_search_algorithms_agree_and_report_settled_nodes(grid_simulation):
+    simulation_engine = grid_simulation(12, total_vehicles=20000, seed=12)
+    prediction_engine = PredictionEngine()
+    engines = {
+        algorithm: RoutingEngine(simulation_engine, prediction_engine, search_algorithm=algorithm, route_cache_size=0)
+        for algorithm in ("dijkstra", "astar", "bidirectional", "cch")
+    }
+    pairs = [((6.45, 3.30), (6.505, 3.355)), ((6.50, 3.31), (6.455, 3.35)), ((6.47, 3.34), (6.49, 3.305))]
+
+    for origin, destination in pairs:
+        results = {algorithm: engine.analyze_route(origin, destination) for algorithm, engine in engines.items()}
+        expected = results["dijkstra"]
+        assert 0.0 < expected["current_travel_time"] < float("inf")
+        assert 0.0 < expected["predicted_travel_time"] < float("inf")
+        for algorithm, result in results.items():
+            assert result["search"]["algorithm"] == algorithm
+            assert result["current_travel_time"] == pytest.approx(expected["current_travel_time"])
+            assert result["predicted_travel_time"] == pytest.approx(expected["predicted_travel_time"])
+            assert result["search"]["settled_nodes"]["current"] >= 1
+        assert results["astar"]["search"]["settled_nodes"]["current"] <= expected["search"]["settled_nodes"]["current"]
+
+    with pytest.raises(ValueError):
+        RoutingEngine(simulation_engine, prediction_engine, search_algorithm="greedy")
+
+
+def test_route_cache_serves_repeat_queries_until_an_incident(grid_simulation):
+    simulation_engine = grid_simulation(8)
+    routing_engine = RoutingEngine(simulation_engine, PredictionEngine())
+    origin, destination = (6.45, 3.30), (6.485, 3.335)
+
+    first = routing_engine.analyze_route(origin, destination)
+    second = routing_engine.analyze_route(origin, destination)
+
+    assert first["route_geometry"]
+    assert not first["search"]["cache_hit"]
+    assert second["search"]["cache_hit"]
+    assert second["search"]["settled_nodes"] == {"current": 0, "predicted": 0}
+    assert second["current_travel_time"] == first["current_travel_time"]
+
+    entry = next(iter(routing_engine.route_cache._entries.values()))
+    used_segment = simulation_engine.segments[entry.segments["current"][0]]
+    simulation_engine.inject_incident(used_segment.id, severity=0.9, duration_ticks=10)
+    third = routing_engine.analyze_route(origin, destination)
+
+    assert not third["search"]["cache_hit"]
+    assert routing_engine.route_cache.stats()["invalidations"] == 1
+
+    # Until the next tick the weights predate the incident, so nothing is re-cached from them.
+    assert not routing_engine.analyze_route(origin, destination)["search"]["cache_hit"]
+    simulation_engine.tick()
+    routing_engine.analyze_route(origin, destination)
+    assert routing_engine.analyze_route(origin, destination)["search"]["cache_hit"]
+
+
+def test_travel_time_matrix_matches_point_queries_in_process_and_pool(grid_simulation):
+    simulation_engine = grid_simulation(8)
+    origins = [(6.45, 3.30), (6.47, 3.32), (6.485, 3.30)]
+    destinations = [(6.485, 3.335), (6.45, 3.30), (6.70, 3.60)]
+
+    local = RoutingEngine(simulation_engine, PredictionEngine(), matrix_workers=0)
+    pooled = RoutingEngine(simulation_engine, PredictionEngine(), matrix_workers=2, matrix_parallel_pairs=1)
+    try:
+        expected = local.travel_time_matrix(origins, destinations)
+        assert pooled.travel_time_matrix(origins, destinations) == expected
+    finally:
+        pooled.close()
+
+    snapshot = local.cost_snapshot()
+    for i, origin in enumerate(origins):
+        for j, destination in enumerate(destinations):
+            _, cost, _ = local._shortest_path(
+                local._nearest_node(*origin), local._nearest_node(*destination), snapshot, "current"
+            )
+            assert expected["current"][i][j] == round(cost, 2)
+    assert expected["current"][0][1] == 0.0
+    assert len(expected["predicted"]) == 3 and len(expected["predicted"][0]) == 3
+
+
+def test_time_dependent_route_is_bounded_by_the_horizon_table(grid_simulation):
+    simulation_engine = grid_simulation(8)
+    routing_engine = RoutingEngine(simulation_engine, PredictionEngine(), search_algorithm="dijkstra")
+    origin, destination = (6.45, 3.30), (6.485, 3.335)
+
+    result = routing_engine.analyze_route(origin, destination, time_dependent=True)
+    costs = routing_engine.horizon_costs()
+
+    assert result["time_dependent"] and result["route_geometry"]
+    assert costs.table.shape == (5, len(simulation_engine.segments))
+    assert routing_engine.horizon_costs() is costs
+    source, target = routing_engine._nearest_node(*origin), routing_engine._nearest_node(*destination)
+    fastest = dijkstra(routing_engine.road_graph, costs.table.min(axis=0).tolist(), source, target)[1]
+    slowest = dijkstra(routing_engine.road_graph, costs.table.max(axis=0).tolist(), source, target)[1]
+    assert round(fastest, 2) <= result["predicted_travel_time"] <= round(slowest, 2)
+
+
+def test_isochrone_matches_full_search_and_is_cached_per_tick(grid_simulation):
+    simulation_engine = grid_simulation(10, total_vehicles=8000)
+    routing_engine = RoutingEngine(simulation_engine, PredictionEngine())
+    origin = (6.47, 3.32)
+
+    result = routing_engine.isochrone(origin, minutes=2.0)
+
+    graph = routing_engine.road_graph
+    weights = routing_engine.cost_snapshot().weights["current"]
+    source = routing_engine._nearest_node(*origin)
+    distance = [dijkstra(graph, weights, source, node)[1] for node in range(graph.num_nodes)]
+    expected = {
+        simulation_engine.segments[idx].id
+        for idx, (start, end) in enumerate(graph.segment_nodes.tolist())
+        if min(distance[start], distance[end]) + weights[idx] <= 2.0
+    }
+    assert expected and set(result["segment_ids"]) == expected
+    assert max(result["arrival_minutes"]) <= 2.0
+    assert routing_engine.isochrone(origin, minutes=2.0) is result
+
+    simulation_engine.tick()
+    assert routing_engine.isochrone(origin, minutes=2.0) is not result
+
+
+def test_analyze_route_returns_requested_alternatives(grid_simulation):
+    simulation_engine = grid_simulation(10, total_vehicles=8000)
+    routing_engine = RoutingEngine(simulation_engine, PredictionEngine())
+
+    result = routing_engine.analyze_route((6.45, 3.30), (6.495, 3.345), alternatives=2)
+
+    assert 1 <= len(result["alternatives"]) <= 2
+    for alternative in result["alternatives"]:
+        assert 1.0 <= alternative["stretch"] <= 1.25
+        assert alternative["route_geometry"] != result["route_geometry"]
+        assert alternative["predicted_travel_time"] >= result["predicted_travel_time"]
+    assert "alternatives" not in routing_engine.analyze_route((6.45, 3.30), (6.495, 3.345))
+    with pytest.raises(ValueError):
+        routing_engine.analyze_route((6.45, 3.30), (6.495, 3.345), time_dependent=True, alternatives=1)
+
+
+def test_alternatives_are_distinct_from_a_cached_primary_route(grid_simulation):
+    simulation_engine = grid_simulation(10, total_vehicles=8000)
+    routing_engine = RoutingEngine(simulation_engine, PredictionEngine())
+    origin, destination = (6.45, 3.30), (6.495, 3.345)
+    source, target = routing_engine._nearest_node(*origin), routing_engine._nearest_node(*destination)
+    weights = routing_engine.cost_snapshot().weights
+
+    # A cached route that is no longer the shortest one, as after a few ticks of drift.
+    routes, _ = via_node_alternatives(routing_engine.road_graph, weights["predicted"], source, target, 1)
+    detour = routes[1][0]
+    routing_engine.route_cache.store(
+        (source, target),
+        CachedRoute(
+            segments={"current": detour, "predicted": detour},
+            costs={mode: sum(weights[mode][idx] for idx in detour) for mode in weights},
+        ),
+    )
+
+    result = routing_engine.analyze_route(origin, destination, alternatives=2)
+
+    assert result["search"]["cache_hit"] is True
+    assert result["route_geometry"] == routing_engine._describe(detour, routing_engine.cost_snapshot())[0]
+    assert result["alternatives"]
+    for alternative in result["alternatives"]:
+        assert alternative["route_geometry"] != result["route_geometry"]
+        expected = alternative["predicted_travel_time"] / result["predicted_travel_time"]
+        assert alternative["stretch"] == pytest.approx(expected, abs=1e-3)
+    # The shortest route is offered as an alternative to the cached one.
+    shortest = routing_engine._describe(routes[0][0], routing_engine.cost_snapshot())[0]
+    assert shortest in [alternative["route_geometry"] for alternative in result["alternatives"]]
+    assert min(alternative["stretch"] for alternative in result["alternatives"]) <= 1.0
@@ -55,3 +55,22 @@ def test_early_morning_demand_lower_than_evening_peak():
     evening_demand = engine._time_of_day_demand(engine.current_time)
 
     assert evening_demand > night_demand
+
+
+def test_vectorized_and_scalar_ticks_keep_state_views_consistent():
+    for vectorized in (True, False):
+        engine = SimulationEngine(num_segments=50, total_vehicles=5000, tick_interval_seconds=1, seed=7, vectorized=vectorized)
+        engine.inject_incident(segment_id=3, severity=0.9, duration_ticks=1)
+        engine.tick()
+
+        rows = engine.get_live_segments()
+        assert len(rows) == len(engine.live_state) == 50
+        assert rows[2]["incident_flag"] == 1
+        assert engine.live_state[3]["incident_flag"] == 1
+        assert 3 not in engine.incidents
+        assert engine.incident_severity[2] == 0.0
+        for row in rows[:5]:
+            state = engine.live_state[row["segment_id"]]
+            assert state["vehicle_count"] == row["vehicle_count"]
+            assert 1.0 <= state["avg_speed"] <= row["free_flow_speed"]
+            assert 0.0 <= state["congestion_index"] <= 1.0
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.services.state_cache import StateCache
+
+
+def test_async_path_falls_back_to_memory_without_redis(monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://127.0.0.1:1/0")
+    cache = StateCache()
+
+    async def roundtrip():
+        await cache.aset_many({"a": b"1", "b": b"2"})
+        values = await cache.aget_many(["a", "missing", "b"])
+        controls = await cache.aget_json("controls", {"paused": False})
+        await cache.aclose()
+        return values, controls
+
+    assert asyncio.run(roundtrip()) == ([b"1", None, b"2"], {"paused": False})
+    assert cache.get_bytes("b") == b"2"
@@ -0,0 +1,69 @@
+import numpy as np
+
+from app.core.prediction_engine import PredictionEngine
+from app.core.training_store import TrainingStore
+
+
+def test_store_keeps_latest_rows_in_tick_order_after_wrapping():
+    store = TrainingStore(max_rows=10, num_features=2)
+    for tick in range(1, 6):
+        rows = np.full((3, 2), tick, dtype=np.float64)
+        store.append_block(rows, target=np.full(3, tick / 10), tick=tick, segment_ids=np.array([1, 2, 3]))
+
+    columns = store.columns()
+    assert len(store) == 10
+    assert columns["tick"].tolist() == [2, 3, 3, 3, 4, 4, 4, 5, 5, 5]
+    assert columns["features"][:, 0].tolist() == columns["tick"].astype(np.float32).tolist()
+    assert columns["segment_id"][-3:].tolist() == [1, 2, 3]
+
+
+def test_columns_are_a_snapshot_unaffected_by_later_appends():
+    store = TrainingStore(max_rows=100, num_features=3)
+    store.append_block(np.ones((60, 3)), target=np.zeros(60), tick=1, segment_ids=np.arange(60))
+    columns = store.columns()
+    assert not np.shares_memory(columns["features"], store.features)
+
+    # Wraps the ring and overwrites the oldest rows the snapshot holds.
+    store.append_block(np.full((60, 3), 2.0), target=np.ones(60), tick=2, segment_ids=np.arange(60))
+    assert len(columns["tick"]) == 60
+    assert columns["tick"].tolist() == [1] * 60 and columns["features"].max() == 1.0
+
+
+class _AppendOnFirstRead(np.ndarray):
+    """Column that runs an append in the middle of `columns()` copying it."""
+
+    def __getitem__(self, key):
+        hook, self.hook = getattr(self, "hook", None), None
+        if hook is not None:
+            hook()
+        return super().__getitem__(key).view(np.ndarray)
+
+
+def test_rows_overwritten_while_copying_are_dropped():
+    store = TrainingStore(max_rows=10, num_features=1)
+    for tick in range(1, 6):
+        store.append_block(np.full((2, 1), tick), target=np.full(2, tick), tick=tick, segment_ids=np.arange(2))
+
+    # The target column is copied after features; an append lands in between.
+    target = store.target.view(_AppendOnFirstRead)
+    target.hook = lambda: store.append_block(np.full((3, 1), 6), target=np.full(3, 6), tick=6, segment_ids=np.arange(3))
+    store.target = target
+    columns = store.columns()
+
+    assert columns["tick"].tolist() == [2, 3, 3, 4, 4, 5, 5]
+    assert columns["target"].tolist() == columns["features"][:, 0].tolist() == columns["tick"].tolist()
+
+    store.clear()
+    assert len(store) == 0 and len(store.columns()["tick"]) == 0
+
+
+def test_prediction_engine_dataset_is_bounded_by_max_rows():
+    engine = PredictionEngine(max_rows=50)
+    for tick in range(1, 31):
+        engine.add_observation({"segment_id": 1, "lag_1": 0.2, "rolling_mean_15": 0.2}, target=0.25, tick=tick)
+        engine.add_observations(np.zeros((2, 11)), targets=np.array([0.1, 0.3]), segment_ids=np.array([2, 3]), tick=tick)
+
+    data = engine.rows.columns()
+    assert len(data["tick"]) == 50
+    assert np.all(np.diff(data["tick"]) >= 0)
+    assert data["target"][data["segment_id"] == 1][-5:].tolist() == [0.25] * 5
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from app.core.prediction_engine import PredictionEngine
+from app.core.tree_inference import CompiledTreeEnsemble
+
+
+def _data(rows: int = 600):
+    rng = np.random.default_rng(4)
+    x = rng.uniform(0, 1, size=(rows, 11)).astype(np.float32)
+    y = 0.6 * x[:, 2] + 0.2 * x[:, 5] + rng.normal(0, 0.02, size=rows)
+    return x, y
+
+
+@pytest.mark.parametrize(
+    "model",
+    [
+        RandomForestRegressor(n_estimators=15, random_state=1, n_jobs=1),
+        GradientBoostingRegressor(n_estimators=30, random_state=1),
+    ],
+)
+def test_compiled_ensemble_matches_sklearn(model):
+    x, y = _data()
+    model.fit(x, y)
+    compiled = CompiledTreeEnsemble.from_sklearn(model)
+
+    probe = np.random.default_rng(9).uniform(0, 1, size=(257, 11))
+    assert compiled.n_trees == len(model.estimators_)
+    np.testing.assert_allclose(compiled.predict(probe), model.predict(probe), rtol=0, atol=1e-12)
+    # Training rows sit exactly on split thresholds, which exercises the float32 comparison.
+    np.testing.assert_allclose(compiled.predict(x), model.predict(x), rtol=0, atol=1e-12)
+
+
+def test_non_tree_models_are_not_compiled():
+    x, y = _data(50)
+    assert CompiledTreeEnsemble.from_sklearn(LinearRegression().fit(x, y)) is None
+
+
+def test_prediction_engine_serves_single_rows_from_compiled_ensemble():
+    x, y = _data()
+    model = RandomForestRegressor(n_estimators=20, random_state=1, n_jobs=1).fit(x, y)
+    engine = PredictionEngine()
+    engine._install_model(model, "random_forest")
+
+    assert engine._compiled is not None and engine._compiled[0] is model
+
+    pred, _, _ = engine.predict_batch(x[:1].astype(np.float64))
+    assert pred[0] == pytest.approx(min(max(model.predict(x[:1])[0], 0.0), 1.0))
+
+    sklearn_engine = PredictionEngine(inference_backend="sklearn")
+    sklearn_engine._install_model(model, "random_forest")
+    assert sklearn_engine._compiled is None